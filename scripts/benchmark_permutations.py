@@ -0,0 +1,98 @@
+"""Benchmark site-permutation search against the site-by-site loop on rutile supercells."""
+from __future__ import annotations
+
+from time import perf_counter
+
+import numpy as np
+from spglib import get_symmetry_dataset
+
+from spinspg.permutation import get_symmetry_permutations, is_overlap_with_origin
+from spinspg.site_index import PeriodicSiteIndex
+
+
+def get_symmetry_permutations_loop(lattice, positions, numbers, rotations, translations, symprec):
+    """Reference implementation matching sites one by one."""
+    num_sites = len(positions)
+    permutations = []
+    for rot, trans in zip(rotations, translations):
+        new_positions = positions @ rot.T + trans[None, :]
+        perm = [-1 for _ in range(num_sites)]
+        found = [False for _ in range(num_sites)]
+        for i in range(num_sites):
+            for j in range(num_sites):
+                if found[j] or (numbers[i] != numbers[j]):
+                    continue
+                if is_overlap_with_origin(lattice, new_positions[i] - positions[j], symprec):
+                    perm[i] = j
+                    found[j] = True
+                    break
+        permutations.append(np.array(perm))
+    return permutations
+
+
+def get_rutile_supercell(size: int):
+    a = 4.87
+    c = 3.31
+    x_4f = 0.695169
+    lattice = np.diag([a, a, c])
+    positions = np.array(
+        [
+            [0, 0, 0],
+            [0.5, 0.5, 0.5],
+            [x_4f, x_4f, 0],
+            [-x_4f, -x_4f, 0],
+            [-x_4f + 0.5, x_4f + 0.5, 0.5],
+            [x_4f + 0.5, -x_4f + 0.5, 0.5],
+        ]
+    )
+    numbers = np.array([0, 0, 1, 1, 1, 1])
+
+    shifts = np.array([[i, j, k] for i in range(size) for j in range(size) for k in range(size)])
+    sc_positions = ((positions[None, :, :] + shifts[:, None, :]) / size).reshape(-1, 3)
+    sc_numbers = np.tile(numbers, len(shifts))
+    return lattice * size, sc_positions, sc_numbers
+
+
+def main():
+    symprec = 1e-5
+    print(
+        f"{'num_sites':>10} {'num_sym':>8} {'loop [s]':>10} {'vectorized [s]':>15} {'cell list [s]':>14}"
+    )
+    for size in [1, 2, 3, 4, 6, 8, 12]:
+        lattice, positions, numbers = get_rutile_supercell(size)
+        dataset = get_symmetry_dataset((lattice, positions, numbers), symprec)
+        # Restrict to point-group part to keep the loop tractable
+        rotations = dataset["rotations"][:16]
+        translations = dataset["translations"][:16]
+
+        start = perf_counter()
+        perms = get_symmetry_permutations(
+            lattice, positions, numbers, rotations, translations, symprec
+        )
+        elapsed = perf_counter() - start
+
+        start = perf_counter()
+        site_index = PeriodicSiteIndex(lattice, positions, numbers, symprec)
+        perms_index = get_symmetry_permutations(
+            lattice, positions, numbers, rotations, translations, symprec, site_index=site_index
+        )
+        elapsed_index = perf_counter() - start
+        assert all(np.all(p.permutation == q.permutation) for p, q in zip(perms, perms_index))
+
+        if len(positions) <= 400:
+            start = perf_counter()
+            perms_loop = get_symmetry_permutations_loop(
+                lattice, positions, numbers, rotations, translations, symprec
+            )
+            elapsed_loop = f"{perf_counter() - start:10.3f}"
+            assert all(np.all(p.permutation == q) for p, q in zip(perms, perms_loop))
+        else:
+            elapsed_loop = f"{'-':>10}"
+
+        print(
+            f"{len(positions):>10} {len(rotations):>8} {elapsed_loop} {elapsed:15.3f} {elapsed_index:14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 """Import top APIs and version."""
 from importlib.metadata import PackageNotFoundError, version
 
-from spinspg.core import get_spin_symmetry  # noqa: F401
+from spinspg.core import (  # noqa: F401
+    get_spin_symmetry,
+    get_spin_symmetry_batch,
+    get_spin_symmetry_operations,
+)
+from spinspg.utils import Deadline, PartialResultWarning  # noqa: F401
 
 # https://github.com/pypa/setuptools_scm/#retrieving-package-version-at-runtime
 try:
@@ -0,0 +1,472 @@
+"""Caches for symmetry of crystal structures."""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from importlib.metadata import PackageNotFoundError, version
+from threading import Lock
+
+import numpy as np
+
+from spinspg.group import (
+    NonmagneticSymmetry,
+    get_primitive_spin_symmetry,
+    get_symmetry_with_cell,
+)
+from spinspg.operations import SpinSymmetryOperations
+from spinspg.permutation import PermutationGroup
+from spinspg.spin import SpinOnlyGroup, SpinOnlyGroupType
+from spinspg.utils import Deadline, NDArrayFloat, NDArrayInt
+
+# Bump when layouts of keys or blobs change
+SCHEMA_VERSION = 1
+
+
+def get_cell_fingerprint(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    symprec: float,
+    angle_tolerance: float,
+) -> str:
+    """Return a hash of a crystal structure and tolerances.
+
+    Basis vectors are quantized with step ``symprec`` and fractional coordinates with step ``symprec`` divided by lengths of basis vectors, after wrapping into ``[0, 1)``.
+    Thus, structures differing much less than ``symprec`` usually share a fingerprint.
+    The order of sites is kept because permutations of sites depend on it.
+    """
+    lattice = np.asarray(lattice, dtype=np.float_)
+    positions = np.asarray(positions, dtype=np.float_)
+    numbers = np.asarray(numbers)
+
+    quantized_lattice = np.around(lattice / symprec).astype(np.int64)
+    # Number of quantization steps along each basis vector
+    resolutions = np.maximum(np.around(np.linalg.norm(lattice, axis=1) / symprec), 1).astype(
+        np.int64
+    )
+    quantized_positions = np.remainder(
+        np.around(np.remainder(positions, 1) * resolutions[None, :]).astype(np.int64),
+        resolutions[None, :],
+    )
+
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(quantized_lattice).tobytes())
+    h.update(np.ascontiguousarray(quantized_positions).tobytes())
+    h.update(np.ascontiguousarray(numbers, dtype=np.int64).tobytes())
+    h.update(repr((float(symprec), float(angle_tolerance))).encode())
+    return h.hexdigest()
+
+
+def get_magmoms_fingerprint(magmoms: NDArrayFloat, mag_symprec: float) -> str:
+    """Return a hash of magnetic moments quantized with step ``mag_symprec``."""
+    quantized = np.around(np.asarray(magmoms, dtype=np.float_) / mag_symprec).astype(np.int64)
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(quantized).tobytes())
+    h.update(repr(float(mag_symprec)).encode())
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    """Statistics of a cache.
+
+    Attributes
+    ----------
+    hits: int
+        Number of lookups answered from the cache
+    misses: int
+        Number of lookups that required computation
+    maxsize: int
+        Maximum number of entries
+    currsize: int
+        Current number of entries
+    """
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class NonmagneticSymmetryCache:
+    """In-process LRU cache of :class:`group.NonmagneticSymmetry` keyed by :func:`get_cell_fingerprint`.
+
+    Repeated crystal structures skip spglib and matching sites.
+    Cached objects are shared among callers and should not be modified.
+
+    Parameters
+    ----------
+    maxsize: int, default=128
+        Maximum number of cached crystal structures. The least recently used one is dropped first.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 1:
+            raise ValueError("maxsize should be positive")
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, NonmagneticSymmetry] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        """Return number of cached crystal structures."""
+        return len(self._entries)
+
+    def get_symmetry_with_cell(
+        self,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        numbers: NDArrayInt,
+        symprec: float,
+        angle_tolerance: float,
+        deadline: Deadline | None = None,
+    ) -> NonmagneticSymmetry:
+        """Return cached result of :func:`group.get_symmetry_with_cell` or compute and cache it.
+
+        Partial results stopped by ``deadline`` are not cached.
+        """
+        key = get_cell_fingerprint(lattice, positions, numbers, symprec, angle_tolerance)
+        with self._lock:
+            ns = self._entries.get(key)
+            if ns is not None:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return ns
+            self._misses += 1
+
+        ns = get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance, deadline=deadline
+        )
+        if ns.is_partial:
+            return ns
+        with self._lock:
+            self._entries[key] = ns
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return ns
+
+    def invalidate(
+        self,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        numbers: NDArrayInt,
+        symprec: float,
+        angle_tolerance: float,
+    ) -> bool:
+        """Drop the entry of a crystal structure and return true if it was cached."""
+        key = get_cell_fingerprint(lattice, positions, numbers, symprec, angle_tolerance)
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Drop all entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        """Return statistics of this cache."""
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                maxsize=self._maxsize,
+                currsize=len(self._entries),
+            )
+
+
+class PersistentSymmetryCache:
+    """On-disk cache of symmetry of crystal structures and spin arrangements in a SQLite file.
+
+    Entries are arrays stored by :func:`numpy.savez` without pickling.
+    Restarted jobs and processes on the same machine sharing ``path`` reuse each other's results.
+    The database uses write-ahead logging, so multiple processes may read and write it concurrently.
+    Each process should open its own instance.
+    Keys consist of :data:`SCHEMA_VERSION`, the version of spinspg, and fingerprints of inputs.
+    Entries written by other versions of spinspg or of the schema are dropped on opening.
+
+    Parameters
+    ----------
+    path: str or path-like
+        SQLite file, created if missing
+    max_bytes: int, default=1 << 30
+        Maximum total size of stored blobs. The least recently used entries are dropped first.
+    timeout: float, default=30
+        Seconds to wait for locks held by other processes
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        max_bytes: int = 1 << 30,
+        timeout: float = 30.0,
+    ):
+        self._path = os.fspath(path)
+        self._max_bytes = max_bytes
+        self._version = f"{SCHEMA_VERSION}:{_get_spinspg_version()}"
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+        self._connection = sqlite3.connect(
+            self._path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, blob BLOB NOT NULL, size INTEGER NOT NULL, "
+                "accessed REAL NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            row = cursor.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != self._version:
+                # Drop stale entries
+                cursor.execute("DELETE FROM entries")
+                cursor.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+                    (self._version,),
+                )
+
+    def __len__(self) -> int:
+        """Return number of stored entries."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def num_bytes(self) -> int:
+        """Return total size of stored blobs."""
+        with self._lock:
+            row = self._connection.execute("SELECT SUM(size) FROM entries").fetchone()
+        return row[0] or 0
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def get_symmetry_with_cell(
+        self,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        numbers: NDArrayInt,
+        symprec: float,
+        angle_tolerance: float,
+        deadline: Deadline | None = None,
+    ) -> NonmagneticSymmetry:
+        """Return stored result of :func:`group.get_symmetry_with_cell` or compute and store it.
+
+        Partial results stopped by ``deadline`` are not stored.
+        """
+        key = ":".join(
+            [
+                self._version,
+                "ns",
+                get_cell_fingerprint(lattice, positions, numbers, symprec, angle_tolerance),
+            ]
+        )
+        arrays = self._load(key)
+        if arrays is not None:
+            return _arrays_to_nonmagnetic_symmetry(arrays)
+
+        ns = get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance, deadline=deadline
+        )
+        if not ns.is_partial:
+            self._store(key, _nonmagnetic_symmetry_to_arrays(ns))
+        return ns
+
+    def get_spin_symmetry_operations(
+        self,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        numbers: NDArrayInt,
+        magmoms: NDArrayFloat,
+        symprec: float,
+        angle_tolerance: float,
+        deadline: Deadline | None = None,
+    ) -> SpinSymmetryOperations:
+        """Return stored spin symmetry operations of a spin arrangement or compute and store them.
+
+        Partial results stopped by ``deadline`` are not stored.
+        See :func:`core.get_spin_symmetry_operations` for parameters.
+        """
+        key = ":".join(
+            [
+                self._version,
+                "ops",
+                get_cell_fingerprint(lattice, positions, numbers, symprec, angle_tolerance),
+                get_magmoms_fingerprint(magmoms, symprec),
+            ]
+        )
+        arrays = self._load(key)
+        if arrays is not None:
+            return _arrays_to_operations(arrays)
+
+        ns = self.get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance, deadline=deadline
+        )
+        ssg = get_primitive_spin_symmetry(ns, magmoms, symprec, deadline=deadline)
+        operations = SpinSymmetryOperations.from_spin_space_group(ssg)
+        if not operations.is_partial:
+            self._store(key, _operations_to_arrays(operations))
+        return operations
+
+    def clear(self):
+        """Drop all entries and reset statistics."""
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM entries")
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        """Return statistics of lookups by this instance.
+
+        ``maxsize`` and ``currsize`` are measured in bytes of stored blobs.
+        """
+        num_bytes = self.num_bytes
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                maxsize=self._max_bytes,
+                currsize=num_bytes,
+            )
+
+    def _transaction(self):
+        return _Transaction(self._connection, self._lock)
+
+    def _load(self, key: str) -> dict[str, np.ndarray] | None:
+        with self._transaction() as cursor:
+            row = cursor.execute("SELECT blob FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                cursor.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        with np.load(io.BytesIO(row[0]), allow_pickle=False) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    def _store(self, key: str, arrays: dict[str, np.ndarray]):
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        blob = buffer.getvalue()
+        if len(blob) > self._max_bytes:
+            return
+
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO entries (key, blob, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            # Evict least recently used entries
+            total = cursor.execute("SELECT SUM(size) FROM entries").fetchone()[0] or 0
+            rows = cursor.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall()
+            for old_key, size in rows:
+                if total <= self._max_bytes:
+                    break
+                if old_key == key:
+                    continue
+                cursor.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                total -= size
+
+
+class _Transaction:
+    """Write transaction locking the database among processes and threads."""
+
+    def __init__(self, connection: sqlite3.Connection, lock: Lock):
+        self._connection = connection
+        self._lock = lock
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self._lock.acquire()
+        try:
+            self._cursor = self._connection.cursor()
+            self._cursor.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._cursor
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._cursor.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self._cursor.close()
+            self._lock.release()
+
+
+def _get_spinspg_version() -> str:
+    try:
+        return version("spinspg")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _nonmagnetic_symmetry_to_arrays(ns: NonmagneticSymmetry) -> dict[str, np.ndarray]:
+    return {
+        "prim_lattice": ns.prim_lattice,
+        "prim_rotations": ns.prim_rotations,
+        "prim_translations": ns.prim_translations,
+        "prim_permutations": ns.prim_permutations.permutations,
+        "prim_centerings": ns.prim_centerings,
+        "prim_centering_permutations": ns.prim_centering_permutations.permutations,
+        "transformation": ns.transformation,
+    }
+
+
+def _arrays_to_nonmagnetic_symmetry(arrays: dict[str, np.ndarray]) -> NonmagneticSymmetry:
+    return NonmagneticSymmetry(
+        prim_lattice=arrays["prim_lattice"],
+        prim_rotations=arrays["prim_rotations"],
+        prim_translations=arrays["prim_translations"],
+        prim_permutations=PermutationGroup(arrays["prim_permutations"]),
+        prim_centerings=arrays["prim_centerings"],
+        prim_centering_permutations=PermutationGroup(arrays["prim_centering_permutations"]),
+        transformation=arrays["transformation"],
+    )
+
+
+def _operations_to_arrays(operations: SpinSymmetryOperations) -> dict[str, np.ndarray]:
+    sog = operations.spin_only_group
+    return {
+        "spin_only_group_type": np.array(sog.spin_only_group_type.value),
+        "axis": np.zeros(0) if sog.axis is None else sog.axis,
+        "rotations": operations.rotations,
+        "translations": operations.translations,
+        "spin_rotations": operations.spin_rotations,
+        "spin_translations": operations.spin_translations,
+        "spin_translation_rotations": operations.spin_translation_rotations,
+        "centerings": operations.centerings,
+        "transformation": operations.transformation,
+    }
+
+
+def _arrays_to_operations(arrays: dict[str, np.ndarray]) -> SpinSymmetryOperations:
+    axis = arrays["axis"]
+    spin_only_group = SpinOnlyGroup(
+        spin_only_group_type=SpinOnlyGroupType(int(arrays["spin_only_group_type"])),
+        axis=axis if len(axis) > 0 else None,
+    )
+    return SpinSymmetryOperations(
+        spin_only_group=spin_only_group,
+        rotations=arrays["rotations"],
+        translations=arrays["translations"],
+        spin_rotations=arrays["spin_rotations"],
+        spin_translations=arrays["spin_translations"],
+        spin_translation_rotations=arrays["spin_translation_rotations"],
+        centerings=arrays["centerings"],
+        transformation=arrays["transformation"],
+    )
@@ -1,11 +1,23 @@
 """Core APIs."""
 from __future__ import annotations
 
+import warnings
+from dataclasses import dataclass
+from time import perf_counter
+
 import numpy as np
 
-from spinspg.group import get_primitive_spin_symmetry, get_symmetry_with_cell
+from spinspg.cache import NonmagneticSymmetryCache, PersistentSymmetryCache
+from spinspg.group import (
+    NonmagneticSymmetry,
+    SpinSpaceGroup,
+    get_primitive_spin_symmetry,
+    get_primitive_spin_symmetry_batch,
+    get_symmetry_with_cell,
+)
+from spinspg.operations import SpinSymmetryOperations
 from spinspg.spin import SpinOnlyGroup
-from spinspg.utils import NDArrayFloat, NDArrayInt
+from spinspg.utils import Deadline, NDArrayFloat, NDArrayInt, PartialResultWarning
 
 
 def get_spin_symmetry(
@@ -15,6 +27,10 @@ def get_spin_symmetry(
     magmoms: NDArrayFloat,
     symprec: float = 1e-5,
     angle_tolerance: float = -1.0,
+    out: tuple[NDArrayInt, NDArrayFloat, NDArrayFloat] | None = None,
+    cache: NonmagneticSymmetryCache | PersistentSymmetryCache | None = None,
+    nonmagnetic_symmetry: NonmagneticSymmetry | None = None,
+    deadline: Deadline | None = None,
 ) -> tuple[SpinOnlyGroup, NDArrayInt, NDArrayFloat, NDArrayFloat]:
     """Return spin symmetry operations of a given spin arrangement.
 
@@ -35,6 +51,20 @@ def get_spin_symmetry(
         See :ref:`spglib:variables_symprec`.
     angle_tolerance: float, default=-1
         See :ref:`spglib:variables_angle_tolerance`.
+    out: tuple of arrays, optional
+        Preallocated buffers for ``rotations``, ``translations``, and ``spin_rotations``.
+        See :meth:`operations.SpinSymmetryOperations.to_arrays`.
+    cache: :class:`cache.NonmagneticSymmetryCache` or :class:`cache.PersistentSymmetryCache`, optional
+        If given, symmetry of the crystal structure without magnetic moments is looked up in and stored to ``cache``.
+        :class:`cache.PersistentSymmetryCache` also stores spin symmetry operations.
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`, optional
+        Precomputed symmetry of the crystal structure, e.g., from :func:`group.get_symmetry_from_operations`.
+        If given, spglib and ``cache`` are not used.
+    deadline: :class:`utils.Deadline`, optional
+        Time budget or cancellation token checked between operations while matching sites and searching spin rotations.
+        Once it is set, spin symmetry operations verified so far are returned and :class:`utils.PartialResultWarning` is issued.
+        Use :func:`get_spin_symmetry_operations` to check :attr:`operations.SpinSymmetryOperations.is_partial` without warnings.
+        Spglib's search of the crystal structure is not interrupted.
 
     Returns
     -------
@@ -48,27 +78,177 @@ def get_spin_symmetry(
         Spin rotation parts of spin symmetry operations in Cartesian coordinates.
 
     """
-    ns = get_symmetry_with_cell(lattice, positions, numbers, symprec, angle_tolerance)
-    ssg = get_primitive_spin_symmetry(ns, magmoms, symprec)
-
-    spin_only_group = ssg.spin_only_group
-    tmat = ssg.transformation
-    invtmat = np.linalg.inv(tmat)
-    rotations = []
-    translations = []
-    spin_rotations = []
-
-    # Products of "translations in cell", "nontrivial spin translation group's coset", and "nontrivial spin space group's coset"
-    for ops in ssg.nontrivial_coset:
-        # Transform to primitive to input cell
-        new_rotation = np.around(invtmat @ ops.rotation @ tmat).astype(np.int_)
-        for ops_st in ssg.spin_translation_coset:
-            for centering in ssg.prim_centerings:
-                new_translation = np.remainder(
-                    invtmat @ (ops.translation + ops_st.translation + centering), 1
-                )
-                rotations.append(new_rotation)
-                translations.append(new_translation)
-                spin_rotations.append(ops_st.spin_rotation @ ops.spin_rotation)
-
-    return spin_only_group, np.array(rotations), np.array(translations), np.array(spin_rotations)
+    operations = get_spin_symmetry_operations(
+        lattice,
+        positions,
+        numbers,
+        magmoms,
+        symprec,
+        angle_tolerance,
+        cache=cache,
+        nonmagnetic_symmetry=nonmagnetic_symmetry,
+        deadline=deadline,
+    )
+    if operations.is_partial:
+        warnings.warn(
+            f"Deadline is exhausted and only {len(operations)} verified spin symmetry "
+            "operations are returned.",
+            PartialResultWarning,
+            stacklevel=2,
+        )
+    rotations, translations, spin_rotations = operations.to_arrays(out=out)
+    return operations.spin_only_group, rotations, translations, spin_rotations
+
+
+def get_spin_symmetry_operations(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    magmoms: NDArrayFloat,
+    symprec: float = 1e-5,
+    angle_tolerance: float = -1.0,
+    cache: NonmagneticSymmetryCache | PersistentSymmetryCache | None = None,
+    nonmagnetic_symmetry: NonmagneticSymmetry | None = None,
+    deadline: Deadline | None = None,
+) -> SpinSymmetryOperations:
+    """Return spin symmetry operations of a given spin arrangement without expanding them.
+
+    Operations are kept as products of cosets and expanded only on access.
+    See :func:`get_spin_symmetry` for parameters.
+
+    Returns
+    -------
+    operations: :class:`operations.SpinSymmetryOperations`
+        ``is_partial`` is true if the search is stopped by ``deadline``.
+    """
+    if nonmagnetic_symmetry is not None:
+        ns = nonmagnetic_symmetry
+    elif isinstance(cache, PersistentSymmetryCache):
+        return cache.get_spin_symmetry_operations(
+            lattice, positions, numbers, magmoms, symprec, angle_tolerance, deadline=deadline
+        )
+    else:
+        ns = _get_nonmagnetic_symmetry(
+            lattice, positions, numbers, symprec, angle_tolerance, cache, deadline=deadline
+        )
+    ssg = get_primitive_spin_symmetry(ns, magmoms, symprec, deadline=deadline)
+    return SpinSymmetryOperations.from_spin_space_group(ssg)
+
+
+@dataclass
+class SpinSymmetryBatch:
+    """Spin symmetry of spin arrangements sharing one crystal structure.
+
+    Identical spin arrangements share one :class:`group.SpinSpaceGroup`.
+
+    Attributes
+    ----------
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`
+        Symmetry of the crystal structure without magnetic moments
+    spin_space_groups: list[:class:`group.SpinSpaceGroup`]
+        Spin space groups of distinct spin arrangements
+    indices: array[int], (num_configurations, )
+        The ``i``-th spin arrangement has ``spin_space_groups[indices[i]]``
+    elapsed: float
+        Wall time in seconds including the nonmagnetic symmetry search
+    """
+
+    nonmagnetic_symmetry: NonmagneticSymmetry
+    spin_space_groups: list[SpinSpaceGroup]
+    indices: NDArrayInt
+    elapsed: float
+
+    def __len__(self) -> int:
+        """Return number of spin arrangements."""
+        return len(self.indices)
+
+    def __getitem__(self, idx: int) -> SpinSpaceGroup:
+        """Return spin space group of the ``idx``-th spin arrangement."""
+        return self.spin_space_groups[self.indices[idx]]
+
+    @property
+    def num_operations(self) -> NDArrayInt:
+        """Return number of spin symmetry operations in input cell for each spin arrangement."""
+        counts = np.array(
+            [
+                len(ssg.nontrivial_coset)
+                * len(ssg.spin_translation_coset)
+                * len(ssg.prim_centerings)
+                for ssg in self.spin_space_groups
+            ],
+            dtype=np.int_,
+        )
+        return counts[self.indices]
+
+    @property
+    def throughput(self) -> float:
+        """Return number of processed spin arrangements per second."""
+        return len(self) / max(self.elapsed, float(np.finfo(float).tiny))
+
+
+def get_spin_symmetry_batch(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    magmoms_stack: NDArrayFloat,
+    symprec: float = 1e-5,
+    angle_tolerance: float = -1.0,
+    cache: NonmagneticSymmetryCache | PersistentSymmetryCache | None = None,
+    nonmagnetic_symmetry: NonmagneticSymmetry | None = None,
+) -> SpinSymmetryBatch:
+    """Return spin symmetry of spin arrangements on one crystal structure.
+
+    Symmetry of the crystal structure is searched only once and shared by all spin arrangements.
+    Spin only groups and centerings keeping magnetic moments are determined for all spin arrangements at once by :func:`group.get_primitive_spin_symmetry_batch`.
+    See :func:`get_spin_symmetry` for parameters.
+
+    Parameters
+    ----------
+    magmoms_stack: array, (num_configurations, num_sites, 3)
+        ``magmoms_stack[k, i, :]`` is a magnetic moment at the ``i``-th site in the ``k``-th spin arrangement.
+
+    Returns
+    -------
+    batch: :class:`SpinSymmetryBatch`
+    """
+    start = perf_counter()
+    magmoms_stack = np.asarray(magmoms_stack, dtype=np.float_)
+    num_configurations = len(magmoms_stack)
+    if nonmagnetic_symmetry is not None:
+        ns = nonmagnetic_symmetry
+    else:
+        ns = _get_nonmagnetic_symmetry(
+            lattice, positions, numbers, symprec, angle_tolerance, cache
+        )
+
+    # Search only for distinct spin arrangements
+    distinct, indices = np.unique(
+        magmoms_stack.reshape(num_configurations, -1), axis=0, return_inverse=True
+    )
+    distinct = distinct.reshape(-1, *magmoms_stack.shape[1:])
+    spin_space_groups = get_primitive_spin_symmetry_batch(ns, distinct, symprec)
+
+    return SpinSymmetryBatch(
+        nonmagnetic_symmetry=ns,
+        spin_space_groups=spin_space_groups,
+        indices=np.asarray(indices, dtype=np.int_).reshape(-1),
+        elapsed=perf_counter() - start,
+    )
+
+
+def _get_nonmagnetic_symmetry(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    symprec: float,
+    angle_tolerance: float,
+    cache: NonmagneticSymmetryCache | PersistentSymmetryCache | None,
+    deadline: Deadline | None = None,
+) -> NonmagneticSymmetry:
+    if cache is None:
+        return get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance, deadline=deadline
+        )
+    return cache.get_symmetry_with_cell(
+        lattice, positions, numbers, symprec, angle_tolerance, deadline=deadline
+    )
@@ -2,14 +2,32 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Callable
 
 import numpy as np
 from hsnf import column_style_hermite_normal_form
 from spglib import get_symmetry_dataset
 
-from spinspg.permutation import Permutation, get_symmetry_permutations
-from spinspg.spin import SpinOnlyGroup, get_spin_only_group, solve_procrustes
+from spinspg.permutation import (
+    DEFAULT_MAX_MEMORY,
+    PermutationGroup,
+    get_symmetry_permutations,
+    get_symmetry_permutations_from_generators,
+)
+from spinspg.site_index import PeriodicSiteIndex
+from spinspg.spin import (
+    SpinOnlyGroup,
+    SpinOnlyGroupType,
+    get_procrustes_residuals,
+    get_spin_only_group,
+    get_spin_only_group_from_residuals,
+    get_spin_only_group_residuals,
+    get_spin_only_group_types,
+    solve_procrustes_batch,
+)
 from spinspg.utils import (
+    Deadline,
+    NDArrayBool,
     NDArrayFloat,
     NDArrayInt,
     is_integer_array,
@@ -29,23 +47,27 @@ class NonmagneticSymmetry:
         w.r.t. ``prim_lattice``
     prim_translations: array, (order, 3)
         w.r.t. ``prim_lattice``
-    prim_permutations: array[int], (order, num_sites)
+    prim_permutations: PermutationGroup, (order, num_sites)
         ``num_sites`` is a number of sites in input cell.
-        ``(prim_rotations[p], prim_translations[p])`` moves the ``i``-th site to the ``prim_permutations[p][i]``
+        ``(prim_rotations[p], prim_translations[p])`` moves the ``i``-th site to the ``prim_permutations.permutations[p, i]``
     prim_centerings: array[int], (nc, 3)
         Centering translations w.r.t. ``prim_lattice``
-    prim_centering_permutations: (nc, N)
+    prim_centering_permutations: PermutationGroup, (nc, num_sites)
     transformation: array[int], (3, 3)
         Transformation matrix from primitive to given cell
+    is_partial: bool
+        True if the search is stopped by a deadline and only a part of operations is kept.
+        Then centerings other than the zero vector are dropped unless all of them are matched.
     """
 
     prim_lattice: NDArrayFloat
     prim_rotations: NDArrayInt
     prim_translations: NDArrayFloat
-    prim_permutations: list[Permutation]
+    prim_permutations: PermutationGroup
     prim_centerings: NDArrayInt
-    prim_centering_permutations: list[Permutation]
+    prim_centering_permutations: PermutationGroup
     transformation: NDArrayInt
+    is_partial: bool = False
 
 
 def get_symmetry_with_cell(
@@ -54,50 +76,178 @@ def get_symmetry_with_cell(
     numbers: NDArrayInt,
     symprec: float,
     angle_tolerance: float,
+    use_generators: bool = False,
+    deadline: Deadline | None = None,
 ) -> NonmagneticSymmetry:
-    """Find spatial symmetry operations from nonmagnetic crystal structure."""
+    """Find spatial symmetry operations from nonmagnetic crystal structure.
+
+    If ``use_generators`` is true, sites are matched only for a generating set of symmetry operations and the other permutations are obtained by their compositions.
+    See :func:`get_symmetry_from_operations` for ``deadline``. Spglib's search itself is not interrupted.
+    """
     dataset = get_symmetry_dataset((lattice, positions, numbers), symprec, angle_tolerance)
-    rotations = dataset["rotations"]
-    translations = dataset["translations"]
-    prim_lattice = dataset["primitive_lattice"]
+    if dataset is None:
+        raise ValueError("Fail to search symmetry with spglib.")
+    return get_symmetry_from_operations(
+        lattice,
+        positions,
+        numbers,
+        rotations=dataset.rotations,
+        translations=dataset.translations,
+        symprec=symprec,
+        prim_lattice=dataset.primitive_lattice,
+        use_generators=use_generators,
+        deadline=deadline,
+    )
+
+
+def get_symmetry_from_operations(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    rotations: NDArrayInt,
+    translations: NDArrayFloat,
+    symprec: float,
+    prim_lattice: NDArrayFloat | None = None,
+    permutations: NDArrayInt | PermutationGroup | None = None,
+    use_generators: bool = False,
+    initial_permutations: NDArrayInt | PermutationGroup | None = None,
+    deadline: Deadline | None = None,
+) -> NonmagneticSymmetry:
+    """Build symmetry of nonmagnetic crystal structure from given space-group operations without spglib.
+
+    Parameters
+    ----------
+    lattice: array, (3, 3)
+    positions: array, (num_sites, 3)
+    numbers: array[int], (num_sites, )
+    rotations: array[int], (num_sym, 3, 3)
+        Rotation parts of all space-group operations w.r.t. ``lattice``, such as ``rotations`` of spglib's dataset
+    translations: array, (num_sym, 3)
+        Translation parts of all space-group operations w.r.t. ``lattice``.
+        Operations with identity rotation give centering translations.
+    symprec: float
+    prim_lattice: array, (3, 3), optional
+        Primitive basis vectors in rows, such as ``primitive_lattice`` of spglib's dataset.
+        If not given, it is derived from centering translations.
+    permutations: array[int] or PermutationGroup, (num_sym, num_sites), optional
+        ``permutations[p, i]`` is a site to which the ``p``-th operation moves the ``i``-th site.
+        If given, matching sites is skipped and ``permutations`` are trusted.
+    use_generators: bool, default=False
+        See :func:`get_symmetry_with_cell`
+    initial_permutations: array[int] or PermutationGroup, (num_sym, num_sites), optional
+        Candidate permutations, e.g., ones for a previous frame of relaxation or molecular dynamics.
+        Sites are matched only for operations whose candidates fail verification.
+        Ignored if ``permutations`` is given or ``use_generators`` is true.
+    deadline: :class:`utils.Deadline`, optional
+        Time budget or cancellation token for matching sites, centerings first and then coset representatives.
+        If it is set before all sites are matched, operations matched so far are returned with ``is_partial=True``.
+        Ignored if ``permutations`` is given or ``use_generators`` is true.
+
+    Returns
+    -------
+    nonmagnetic_symmetry: NonmagneticSymmetry
+    """
+    lattice = np.asarray(lattice, dtype=np.float_)
+    rotations = np.asarray(rotations)
+    translations = np.asarray(translations, dtype=np.float_)
 
     # Unique by rotation parts
-    uniq_rotations = []
-    uniq_translations = []
-    centerings = []
+    uniq_indices = []
+    centering_indices = []
     found_rotations = set()
-    for rot, trans in zip(rotations, translations):
+    for idx, rot in enumerate(rotations):
         if np.allclose(rot, np.eye(3)):
-            centerings.append(trans)
+            centering_indices.append(idx)
 
         rot_int = ndarray2d_to_integer_tuple(rot)
         if rot_int in found_rotations:
             continue
-        uniq_rotations.append(rot)
-        uniq_translations.append(trans)
+        uniq_indices.append(idx)
         found_rotations.add(rot_int)
+    uniq_rotations = rotations[uniq_indices]
+    uniq_translations = translations[uniq_indices]
+    centerings = translations[centering_indices]
 
     # Primitive transformation
+    if prim_lattice is None:
+        prim_lattice = get_primitive_lattice_from_centerings(lattice, centerings)
     tmat = np.linalg.inv(prim_lattice.T) @ lattice.T
     assert np.isclose(np.abs(np.linalg.det(tmat)), len(centerings))
 
-    # Permutations of sites
-    prim_permutations = get_symmetry_permutations(
-        lattice,
-        positions,
-        numbers,
-        rotations=uniq_rotations,
-        translations=uniq_translations,
-        symprec=symprec,
-    )
-    prim_centering_permutations = get_symmetry_permutations(
-        lattice,
-        positions,
-        numbers,
-        rotations=[np.eye(3) for _ in range(len(centerings))],
-        translations=centerings,
-        symprec=symprec,
-    )
+    # Permutations of sites, sharing a cell list among all operations
+    is_partial = False
+    if permutations is not None:
+        if isinstance(permutations, PermutationGroup):
+            permutations = permutations.permutations
+        permutations = np.asarray(permutations)
+        assert permutations.shape == (len(rotations), len(positions))
+        prim_permutations = PermutationGroup(permutations[uniq_indices])
+        prim_centering_permutations = PermutationGroup(permutations[centering_indices])
+    elif use_generators:
+        site_index = PeriodicSiteIndex(lattice, positions, numbers, symprec)
+        prim_permutations, prim_centering_permutations = get_symmetry_permutations_from_generators(
+            lattice,
+            positions,
+            numbers,
+            rotations=uniq_rotations,
+            translations=uniq_translations,
+            centerings=centerings,
+            symprec=symprec,
+            site_index=site_index,
+        )
+    else:
+        if initial_permutations is not None:
+            if isinstance(initial_permutations, PermutationGroup):
+                initial_perms = initial_permutations.permutations
+            else:
+                initial_perms = np.asarray(initial_permutations)
+            initial_prim_permutations = initial_perms[uniq_indices]
+            initial_centering_permutations = initial_perms[centering_indices]
+        else:
+            initial_prim_permutations = None
+            initial_centering_permutations = None
+        site_index = PeriodicSiteIndex(lattice, positions, numbers, symprec)
+        prim_centering_permutations, matched_centerings = get_symmetry_permutations(
+            lattice,
+            positions,
+            numbers,
+            rotations=np.tile(np.eye(3, dtype=np.int_), (len(centerings), 1, 1)),
+            translations=centerings,
+            symprec=symprec,
+            site_index=site_index,
+            initial_permutations=initial_centering_permutations,
+            deadline=deadline,
+            return_indices=True,
+        )
+        prim_permutations, matched_reps = get_symmetry_permutations(
+            lattice,
+            positions,
+            numbers,
+            rotations=uniq_rotations,
+            translations=uniq_translations,
+            symprec=symprec,
+            site_index=site_index,
+            initial_permutations=initial_prim_permutations,
+            deadline=deadline,
+            return_indices=True,
+        )
+
+        # Keep operations with permutations. Centerings are kept only if they form a group.
+        is_partial = (
+            deadline is not None
+            and deadline.is_set()
+            and (
+                len(matched_reps) < len(uniq_rotations)
+                or len(matched_centerings) < len(centerings)
+            )
+        )
+        uniq_rotations = uniq_rotations[matched_reps]
+        uniq_translations = uniq_translations[matched_reps]
+        if is_partial and len(matched_centerings) < len(centerings):
+            centerings = np.zeros((1, 3))
+            prim_centering_permutations = PermutationGroup(np.arange(len(positions))[None, :])
+        else:
+            centerings = centerings[matched_centerings]
 
     # To primitive basis (never take modulus!)
     prim_rotations = []
@@ -115,15 +265,163 @@ def get_symmetry_with_cell(
 
     return NonmagneticSymmetry(
         prim_lattice=prim_lattice,
-        prim_rotations=np.array(prim_rotations),
-        prim_translations=np.array(prim_translations),
+        prim_rotations=np.array(prim_rotations, dtype=np.int_).reshape(-1, 3, 3),
+        prim_translations=np.array(prim_translations, dtype=np.float_).reshape(-1, 3),
         prim_permutations=prim_permutations,
-        prim_centerings=np.array(prim_centerings),
+        prim_centerings=np.array(prim_centerings, dtype=np.int_).reshape(-1, 3),
         prim_centering_permutations=prim_centering_permutations,
         transformation=np.around(tmat).astype(np.int_),
+        is_partial=is_partial,
     )
 
 
+def get_primitive_lattice_from_centerings(
+    lattice: NDArrayFloat, centerings: NDArrayFloat
+) -> NDArrayFloat:
+    """Return primitive basis vectors of lattice translations and ``centerings``.
+
+    Parameters
+    ----------
+    lattice: array, (3, 3)
+        ``lattice[i, :]`` is the ``i``-th basis vector
+    centerings: array, (nc, 3)
+        Centering translations w.r.t. ``lattice`` including zero vector
+
+    Returns
+    -------
+    prim_lattice: array, (3, 3)
+        ``prim_lattice[i, :]`` is the ``i``-th primitive basis vector
+    """
+    # Centering translations form a group of order nc, so nc * centerings are integers
+    num_centerings = len(centerings)
+    scaled = np.concatenate(
+        [num_centerings * np.eye(3), num_centerings * np.asarray(centerings).T], axis=1
+    )
+    assert is_integer_array(scaled, atol=1e-4)
+    hnf, _ = column_style_hermite_normal_form(np.around(scaled).astype(int))
+    basis = hnf[:, :3] / num_centerings  # (3, 3), columns are primitive basis vectors
+    return (np.asarray(lattice).T @ basis).T
+
+
+def get_operations_in_cell(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+) -> tuple[NDArrayInt, NDArrayFloat, NDArrayInt]:
+    """Return all operations modulo lattice translations of input cell with their permutations.
+
+    The ``(p * nc + c)``-th operation is given by the ``p``-th coset representative followed by the ``c``-th centering.
+
+    Returns
+    -------
+    rotations: array[int], (num_operations, 3, 3)
+        Rotation parts w.r.t. input cell
+    translations: array, (num_operations, 3)
+        Translation parts w.r.t. input cell
+    permutations: array[int], (num_operations, num_sites)
+    """
+    ns = nonmagnetic_symmetry
+    tmat = ns.transformation
+    invtmat = np.linalg.inv(tmat)
+    prim_perms = ns.prim_permutations.permutations
+    centering_perms = ns.prim_centering_permutations.permutations
+    num_operations = len(prim_perms) * len(centering_perms)
+    num_sites = centering_perms.shape[1]
+
+    rotations = np.around(
+        np.einsum("ij,kjl,lm->kim", invtmat, ns.prim_rotations, tmat, optimize=True)
+    ).astype(np.int_)
+    translations = np.remainder(
+        (ns.prim_translations[:, None, :] + ns.prim_centerings[None, :, :]) @ invtmat.T, 1
+    )
+    # Apply coset representative and then centering
+    permutations = np.take_along_axis(centering_perms[None, :, :], prim_perms[:, None, :], axis=-1)
+    return (
+        np.repeat(rotations, len(centering_perms), axis=0),
+        translations.reshape(num_operations, 3),
+        permutations.reshape(num_operations, num_sites),
+    )
+
+
+@dataclass
+class ParentSymmetry:
+    """Symmetry operations of a parent structure shared by its decorations with species.
+
+    Space group of a decorated structure is a subgroup of that of the parent structure with the same sites.
+    Its operations are ones of the parent structure whose permutations keep species of sites.
+
+    Attributes
+    ----------
+    lattice: array, (3, 3)
+    positions: array, (num_sites, 3)
+    rotations: array[int], (num_sym, 3, 3)
+        Rotation parts of all operations w.r.t. ``lattice``
+    translations: array, (num_sym, 3)
+        Translation parts of all operations w.r.t. ``lattice``
+    permutations: array[int], (num_sym, num_sites)
+        ``(rotations[p], translations[p])`` moves the ``i``-th site to the ``permutations[p, i]``
+    """
+
+    lattice: NDArrayFloat
+    positions: NDArrayFloat
+    rotations: NDArrayInt
+    translations: NDArrayFloat
+    permutations: NDArrayInt
+
+    @classmethod
+    def from_cell(
+        cls,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        symprec: float,
+        angle_tolerance: float,
+    ) -> ParentSymmetry:
+        """Search symmetry of a structure with all sites occupied by the same species."""
+        numbers = np.zeros(len(positions), dtype=np.int_)
+        ns = get_symmetry_with_cell(lattice, positions, numbers, symprec, angle_tolerance)
+        return cls.from_nonmagnetic_symmetry(ns, lattice, positions)
+
+    @classmethod
+    def from_nonmagnetic_symmetry(
+        cls,
+        nonmagnetic_symmetry: NonmagneticSymmetry,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+    ) -> ParentSymmetry:
+        """Expand products of coset representatives and centerings of ``nonmagnetic_symmetry`` in input cell."""
+        rotations, translations, permutations = get_operations_in_cell(nonmagnetic_symmetry)
+        return cls(
+            lattice=np.asarray(lattice, dtype=np.float_),
+            positions=np.asarray(positions, dtype=np.float_),
+            rotations=rotations,
+            translations=translations,
+            permutations=permutations,
+        )
+
+    def decorate(self, numbers: NDArrayInt, symprec: float = 1e-5) -> NonmagneticSymmetry:
+        """Return symmetry of the parent structure decorated with species ``numbers`` without spglib and matching sites.
+
+        Parameters
+        ----------
+        numbers: array[int], (num_sites, )
+        symprec: float, default=1e-5
+
+        Returns
+        -------
+        nonmagnetic_symmetry: NonmagneticSymmetry
+        """
+        numbers = np.asarray(numbers)
+        assert numbers.shape == (self.permutations.shape[1],)
+        kept = np.all(numbers[self.permutations] == numbers[None, :], axis=1)
+        return get_symmetry_from_operations(
+            self.lattice,
+            self.positions,
+            numbers,
+            rotations=self.rotations[kept],
+            translations=self.translations[kept],
+            symprec=symprec,
+            permutations=self.permutations[kept],
+        )
+
+
 @dataclass
 class SpinSymmetryOperation:
     """Spin symmetry operation.
@@ -156,6 +454,11 @@ class SpinSpaceGroup:
         N.B. rotation parts are distinct
     transformation: array[int], (3, 3)
         Transformation matrix from primitive to given cell
+    num_procrustes_solves: int
+        Number of Procrustes problems solved in the search
+    is_partial: bool
+        True if the search is stopped by a deadline.
+        Then operations are verified but may not form a group.
     """
 
     prim_lattice: NDArrayFloat
@@ -164,10 +467,16 @@ class SpinSpaceGroup:
     prim_centerings: NDArrayFloat
     nontrivial_coset: list[SpinSymmetryOperation]
     transformation: NDArrayInt
+    num_procrustes_solves: int = 0
+    is_partial: bool = False
 
 
 def get_primitive_spin_symmetry(
-    nonmagnetic_symmetry: NonmagneticSymmetry, magmoms: NDArrayFloat, mag_symprec: float
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms: NDArrayFloat,
+    mag_symprec: float,
+    staged: bool = False,
+    deadline: Deadline | None = None,
 ) -> SpinSpaceGroup:
     """Return spin space group symmetry.
 
@@ -176,20 +485,197 @@ def get_primitive_spin_symmetry(
     nonmagnetic_symmetry : NonmagneticSymmetry
     magmoms : array, (num_sites, 3)
     mag_symprec : float
+    staged : bool, default=False
+        If true, each spin rotation is first solved only from a few anchor sites and verified on growing blocks of sites.
+        Candidates are dropped only at a residual for which the solution with all sites also violates ``mag_symprec``, so the result is the same as without ``staged``.
+        Only candidates passing all sites are solved again with all sites.
+        Collinear spin arrangements are always handled by comparing signs of moments along the collinear axis without Procrustes problems.
+        Coplanar spin arrangements are always handled by fitting phases of in-plane moments as complex numbers.
+    deadline : :class:`utils.Deadline`, optional
+        Checked before searching spin rotations for each coset representative.
+        If it is set, operations found so far are returned with ``is_partial=True``.
 
     Returns
     -------
     SpinSpaceGroup
     """
     # Centerings for maximal space subgroup of spin space group
-    stg_centerings = []
-    stg_centering_permutations = []
-    for centering, perm in zip(
-        nonmagnetic_symmetry.prim_centerings, nonmagnetic_symmetry.prim_centering_permutations
-    ):
-        if np.max(np.linalg.norm(magmoms[perm.permutation] - magmoms, axis=1)) < mag_symprec:
-            stg_centerings.append(centering)
-            stg_centering_permutations.append(perm)
+    is_stg_centering = get_stg_centerings(nonmagnetic_symmetry, magmoms[None], mag_symprec)[0]
+    spin_translation_lattice = get_spin_translation_lattice(nonmagnetic_symmetry, is_stg_centering)
+
+    # Spin only group
+    spin_only_group = get_spin_only_group(magmoms, mag_symprec)
+
+    return _get_primitive_spin_symmetry(
+        nonmagnetic_symmetry,
+        magmoms,
+        mag_symprec,
+        spin_only_group,
+        spin_translation_lattice,
+        staged=staged,
+        deadline=deadline,
+    )
+
+
+def get_primitive_spin_symmetry_batch(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms_stack: NDArrayFloat,
+    mag_symprec: float,
+) -> list[SpinSpaceGroup]:
+    """Return spin space groups of stacked spin arrangements.
+
+    Spin only groups and centerings keeping magnetic moments are determined for the whole stack at once.
+    Lattices of maximal space subgroups are computed once for each group of spin arrangements sharing these results, and only coset representatives are searched for each spin arrangement.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry : NonmagneticSymmetry
+    magmoms_stack : array, (num_configurations, num_sites, 3)
+    mag_symprec : float
+
+    Returns
+    -------
+    spin_space_groups: list[SpinSpaceGroup]
+        Same as :func:`get_primitive_spin_symmetry` for each spin arrangement
+    """
+    magmoms_stack = np.asarray(magmoms_stack, dtype=np.float_)
+    types, axes = get_spin_only_group_types(magmoms_stack, mag_symprec)
+    is_stg_centerings = get_stg_centerings(nonmagnetic_symmetry, magmoms_stack, mag_symprec)
+
+    # Group spin arrangements by spin only group types and centerings keeping magnetic moments
+    keys = np.concatenate([types[:, None], is_stg_centerings.astype(np.int_)], axis=1)
+    unique_keys, group_indices = np.unique(keys, axis=0, return_inverse=True)
+    group_indices = np.asarray(group_indices).reshape(-1)
+
+    spin_space_groups: list[SpinSpaceGroup | None] = [None] * len(magmoms_stack)
+    for group_index, key in enumerate(unique_keys):
+        spin_translation_lattice = get_spin_translation_lattice(
+            nonmagnetic_symmetry, key[1:].astype(np.bool_)
+        )
+        spin_only_group_type = SpinOnlyGroupType(key[0])
+        for idx in np.nonzero(group_indices == group_index)[0]:
+            # Axes are NaN for nonmagnetic and noncoplanar spin only groups
+            axis = None if np.any(np.isnan(axes[idx])) else axes[idx]
+            spin_only_group = SpinOnlyGroup(spin_only_group_type, axis)
+            spin_space_groups[idx] = _get_primitive_spin_symmetry(
+                nonmagnetic_symmetry,
+                magmoms_stack[idx],
+                mag_symprec,
+                spin_only_group,
+                spin_translation_lattice,
+            )
+    return spin_space_groups  # type: ignore
+
+
+def get_stg_centerings(
+    nonmagnetic_symmetry: NonmagneticSymmetry, magmoms_stack: NDArrayFloat, mag_symprec: float
+) -> NDArrayBool:
+    """Return centerings keeping magnetic moments of stacked spin arrangements.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry : NonmagneticSymmetry
+    magmoms_stack : array, (num_configurations, num_sites, 3)
+    mag_symprec : float
+
+    Returns
+    -------
+    is_stg_centerings: array[bool], (num_configurations, nc)
+        ``is_stg_centerings[k, c]`` is true if the ``c``-th centering moves each magnetic moment of the ``k``-th spin arrangement within ``mag_symprec``
+    """
+    magmoms_stack = np.asarray(magmoms_stack, dtype=np.float_)
+    centering_perms = nonmagnetic_symmetry.prim_centering_permutations.permutations  # (nc, N)
+    is_stg_centerings = np.empty((len(magmoms_stack), len(centering_perms)), dtype=np.bool_)
+    for c, perm in enumerate(centering_perms):
+        diffs = np.linalg.norm(magmoms_stack[:, perm] - magmoms_stack, axis=2)  # (K, N)
+        is_stg_centerings[:, c] = np.max(diffs, axis=1, initial=0) < mag_symprec
+    return is_stg_centerings
+
+
+def _get_primitive_spin_symmetry(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms: NDArrayFloat,
+    mag_symprec: float,
+    spin_only_group: SpinOnlyGroup,
+    spin_translation_lattice: tuple[NDArrayInt, list[NDArrayFloat], NDArrayInt, NDArrayInt],
+    staged: bool = False,
+    deadline: Deadline | None = None,
+) -> SpinSpaceGroup:
+    """Search spin space group with spin only group and lattice of maximal space subgroup given."""
+    centering_perms = nonmagnetic_symmetry.prim_centering_permutations.permutations  # (nc, N)
+    tmat_stg, prim_centerings, transformation, distinct_indices = spin_translation_lattice
+
+    def solve(perms: NDArrayInt) -> tuple[NDArrayFloat, NDArrayFloat, int]:
+        if spin_only_group.spin_only_group_type == SpinOnlyGroupType.COLLINEAR:
+            return _solve_collinear_spin_rotations(
+                magmoms, perms, spin_only_group.axis, mag_symprec  # type: ignore
+            )
+        if spin_only_group.spin_only_group_type == SpinOnlyGroupType.COPLANAR:
+            return _solve_coplanar_spin_rotations(
+                magmoms, perms, spin_only_group, mag_symprec  # type: ignore
+            )
+        return _solve_spin_rotations(magmoms, perms, spin_only_group, mag_symprec, staged=staged)
+
+    # Spin translation group search
+    # Search W in O(3) s.t. magmoms @ W.T = magmoms[perm] for all found centerings at once
+    invtmat_stg = np.linalg.inv(tmat_stg)
+    spin_translation_coset = []
+    Ws, residuals, num_translation_solves = solve(centering_perms[distinct_indices])
+    for idx, W, residual in zip(distinct_indices, Ws, residuals):
+        if residual < mag_symprec:
+            # w.r.t. primitive cell of spin space group
+            reduced_centering = invtmat_stg @ nonmagnetic_symmetry.prim_centerings[idx]
+            spin_translation_coset.append(
+                SpinSymmetryOperation(
+                    rotation=np.eye(3, dtype=np.int_),
+                    translation=reduced_centering,
+                    spin_rotation=W,
+                )
+            )
+
+    # Spin space group search
+    nontrivial_coset, num_coset_solves, is_complete = _search_nontrivial_coset(
+        nonmagnetic_symmetry,
+        magmoms,
+        mag_symprec,
+        spin_only_group,
+        tmat_stg,
+        solve,
+        deadline,
+    )
+
+    # Transform centerings to primitive cell of spin space group
+    prim_spin_lattice = tmat_stg.T @ nonmagnetic_symmetry.prim_lattice
+
+    return SpinSpaceGroup(
+        prim_lattice=prim_spin_lattice,
+        spin_only_group=spin_only_group,
+        spin_translation_coset=spin_translation_coset,
+        prim_centerings=np.array(prim_centerings, dtype=np.float_).reshape(-1, 3),
+        nontrivial_coset=nontrivial_coset,
+        transformation=transformation,
+        num_procrustes_solves=num_translation_solves + num_coset_solves,
+        is_partial=nonmagnetic_symmetry.is_partial or not is_complete,
+    )
+
+
+def get_spin_translation_lattice(
+    nonmagnetic_symmetry: NonmagneticSymmetry, is_stg_centering: NDArrayBool
+) -> tuple[NDArrayInt, list[NDArrayFloat], NDArrayInt, NDArrayInt]:
+    """Return lattice of maximal space subgroup generated by centerings keeping magnetic moments.
+
+    Returns
+    -------
+    tmat_stg: array[int], (3, 3)
+        Transformation matrix to primitive cell of maximal space subgroup
+    prim_centerings: list of array, (3, )
+        Centerings in ``is_stg_centering`` w.r.t. primitive cell of maximal space subgroup
+    transformation: array[int], (3, 3)
+        Transformation matrix from primitive cell of maximal space subgroup to given cell
+    distinct_indices: array[int]
+        Indices of centerings distinct modulo lattice of maximal space subgroup
+    """
+    stg_centerings = nonmagnetic_symmetry.prim_centerings[is_stg_centering]
     assert len(nonmagnetic_symmetry.prim_centerings) % len(stg_centerings) == 0
 
     # Transformation matrix to primitive cell of maximal space subgroup
@@ -204,101 +690,606 @@ def get_primitive_spin_symmetry(
     tmat_stg = tmat_stg[:, :3]  # (3, 3)
     invtmat_stg = np.linalg.inv(tmat_stg)
 
-    # Spin only group
-    spin_only_group = get_spin_only_group(magmoms, mag_symprec)
-
     prim_centerings = [invtmat_stg @ centering for centering in stg_centerings]
     # prim_spin_lattice.T @ transformation == nonmagnetic_symmetry.prim_lattice.T @ nonmagnetic_symmetry.transformation
-    transformation = invtmat_stg @ nonmagnetic_symmetry.transformation
-    assert is_integer_array(transformation)
-    transformation = np.around(transformation).astype(np.int_)
+    transformation_float = invtmat_stg @ nonmagnetic_symmetry.transformation
+    assert is_integer_array(transformation_float)
+    transformation = np.around(transformation_float).astype(np.int_)
 
-    # Spin translation group search
-    spin_translation_coset = []
-    found_stg_centerings = []  # type: ignore
-    for centering, perm in zip(
-        nonmagnetic_symmetry.prim_centerings, nonmagnetic_symmetry.prim_centering_permutations
-    ):
-        # Two centerings are equivalent in primitive cell of spin translation group if they
-        # are translated to each other by lattice translations in `transformation`.
+    # Two centerings are equivalent in primitive cell of spin translation group if they
+    # are translated to each other by lattice translations in `transformation`.
+    distinct_indices: list[int] = []
+    for idx, centering in enumerate(nonmagnetic_symmetry.prim_centerings):
         is_new_centering = True
-        for other in found_stg_centerings:
+        for other in nonmagnetic_symmetry.prim_centerings[distinct_indices]:
             residual = invtmat_stg @ (centering - other)
             residual -= np.rint(residual)
             if np.allclose(residual, 0):
                 is_new_centering = False
                 break
-        if not is_new_centering:
-            continue
-        found_stg_centerings.append(centering)
+        if is_new_centering:
+            distinct_indices.append(idx)
+    assert len(nonmagnetic_symmetry.prim_centerings) % len(distinct_indices) == 0
 
-        # Search W in O(3) s.t. new_magmoms @ W.T = magmoms[perm.permutation]
-        new_magmoms = magmoms.copy()
-        perm_magmoms = magmoms[perm.permutation]
-        W = solve_procrustes(new_magmoms, perm_magmoms)
-        if spin_only_group.contain(W):
-            # Chose W as identify if W belongs to the spin only group
-            W = np.eye(3, dtype=np.float_)
+    return tmat_stg, prim_centerings, transformation, np.array(distinct_indices, dtype=np.int_)
 
-        new_magmoms = new_magmoms @ W.T
-        if np.max(np.linalg.norm(new_magmoms - perm_magmoms, axis=1)) < mag_symprec:
-            # w.r.t. primitive cell of spin space group
-            reduced_centering = invtmat_stg @ centering
-            spin_translation_coset.append(
+
+class SpinSymmetryResiduals:
+    """Residuals of all candidates of spin symmetry operations of one spin arrangement.
+
+    Residuals for spin only groups, for centerings with identity spin rotations, and of Procrustes problems for all pairs of coset representatives and centerings are computed once.
+    Spin space groups for any ``mag_symprec`` are then assembled without solving Procrustes problems again.
+    Membership of a spatial operation is decided by the residual of its Procrustes solution as in :func:`get_primitive_spin_symmetry` for noncoplanar spin arrangements.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry: NonmagneticSymmetry
+    magmoms: array, (num_sites, 3)
+    max_memory: int, default=DEFAULT_MAX_MEMORY
+        Upper bound in bytes of temporary arrays for Procrustes problems
+
+    Attributes
+    ----------
+    spin_only_residuals: array, (3, )
+        See :func:`spin.get_spin_only_group_residuals`
+    identity_residuals: array, (nc, )
+        Residuals of centerings with identity spin rotations
+    centering_residuals: array, (nc, )
+        Residuals of centerings with Procrustes solutions
+    residuals: array, (num_reps, nc)
+        ``residuals[p, c]`` is a residual of the ``p``-th coset representative followed by the ``c``-th centering
+    min_residuals: array, (num_reps, )
+        Smallest residual of each coset representative over centerings
+    """
+
+    def __init__(
+        self,
+        nonmagnetic_symmetry: NonmagneticSymmetry,
+        magmoms: NDArrayFloat,
+        max_memory: int = DEFAULT_MAX_MEMORY,
+    ):
+        self.nonmagnetic_symmetry = ns = nonmagnetic_symmetry
+        magmoms = np.asarray(magmoms, dtype=np.float_)
+
+        # Spin only group
+        (
+            self.spin_only_residuals,
+            self._parallel_axis,
+            self._vertical_axis,
+        ) = get_spin_only_group_residuals(magmoms)
+
+        # Centerings
+        centering_perms = ns.prim_centering_permutations.permutations  # (nc, N)
+        self.identity_residuals = np.max(
+            np.linalg.norm(magmoms[centering_perms] - magmoms[None, :, :], axis=2), axis=1
+        )
+        self._centering_rotations, self.centering_residuals = solve_procrustes_batch(
+            magmoms[None, :, :], magmoms[centering_perms]
+        )
+        # products[i, j] is index of centering ``prim_centerings[i] + prim_centerings[j]``
+        diff = ns.prim_centerings[:, None, None, :] + ns.prim_centerings[None, :, None, :]
+        diff = diff - ns.prim_centerings[None, None, :, :]
+        diff = diff @ np.linalg.inv(ns.transformation).T
+        self._centering_products = np.argmin(
+            np.linalg.norm(diff - np.rint(diff), axis=3), axis=2
+        )  # (nc, nc)
+
+        # All pairs of coset representatives and centerings
+        prim_perms = ns.prim_permutations.permutations  # (num_reps, N)
+        num_reps, num_sites = prim_perms.shape
+        num_centerings = len(centering_perms)
+        perms = np.take_along_axis(
+            centering_perms[None, :, :], prim_perms[:, None, :], axis=-1
+        ).reshape(-1, num_sites)
+        rotations = np.empty((len(perms), 3, 3))
+        residuals = np.empty(len(perms))
+        chunk = max(1, max_memory // (72 * max(num_sites, 1)))
+        for start in range(0, len(perms), chunk):
+            end = min(start + chunk, len(perms))
+            rotations[start:end], residuals[start:end] = solve_procrustes_batch(
+                magmoms[None, :, :], magmoms[perms[start:end]]
+            )
+        self._rotations = rotations.reshape(num_reps, num_centerings, 3, 3)
+        self.residuals = residuals.reshape(num_reps, num_centerings)
+        self.min_residuals = np.min(self.residuals, axis=1, initial=np.inf)
+
+        self._lattices: dict[bytes, tuple] = {}
+        self._contained: dict[int, tuple[NDArrayBool, NDArrayBool]] = {}
+
+    def get_spin_space_group(self, mag_symprec: float) -> SpinSpaceGroup:
+        """Return spin space group with tolerance ``mag_symprec`` from residuals."""
+        ns = self.nonmagnetic_symmetry
+        spin_only_group = self._get_spin_only_group(mag_symprec)
+        (
+            tmat_stg,
+            prim_centerings,
+            transformation,
+            distinct_indices,
+            rot_prims,
+            compatible,
+        ) = self._get_lattice(self._get_centering_subgroup(mag_symprec))
+        invtmat_stg = np.linalg.inv(tmat_stg)
+
+        # Chose W as identity if W belongs to the spin only group
+        contained_centerings, contained = self._get_contained(spin_only_group)
+        centering_rotations = np.where(
+            contained_centerings[:, None, None], np.eye(3), self._centering_rotations
+        )
+        spin_translation_coset = [
+            SpinSymmetryOperation(
+                rotation=np.eye(3, dtype=np.int_),
+                translation=invtmat_stg @ ns.prim_centerings[idx],
+                spin_rotation=centering_rotations[idx],
+            )
+            for idx in distinct_indices
+            if self.centering_residuals[idx] < mag_symprec
+        ]
+
+        # First centering giving a spin symmetry operation for each coset representative
+        valid = self.residuals < mag_symprec
+        firsts = np.argmax(valid, axis=1)
+        nontrivial_coset = []
+        for p in np.nonzero(compatible & np.any(valid, axis=1))[0]:
+            c = firsts[p]
+            nontrivial_coset.append(
                 SpinSymmetryOperation(
-                    rotation=np.eye(3, dtype=np.int_),
-                    translation=reduced_centering,
-                    spin_rotation=W,
+                    rotation=rot_prims[p],
+                    translation=invtmat_stg @ (ns.prim_centerings[c] + ns.prim_translations[p]),
+                    spin_rotation=np.eye(3) if contained[p, c] else self._rotations[p, c],
                 )
             )
 
-    assert len(nonmagnetic_symmetry.prim_centerings) % len(found_stg_centerings) == 0
+        return SpinSpaceGroup(
+            prim_lattice=tmat_stg.T @ ns.prim_lattice,
+            spin_only_group=spin_only_group,
+            spin_translation_coset=spin_translation_coset,
+            prim_centerings=prim_centerings,
+            nontrivial_coset=nontrivial_coset,
+            transformation=transformation,
+        )
+
+    def summarize(self, mag_symprec: float) -> tuple[SpinOnlyGroupType, int]:
+        """Return type of spin only group and number of spin symmetry operations in input cell without assembling spin space group."""
+        spin_only_group_type = self._get_spin_only_group(mag_symprec).spin_only_group_type
+        is_stg_centering = self._get_centering_subgroup(mag_symprec)
+        _, _, _, distinct_indices, _, compatible = self._get_lattice(is_stg_centering)
+        num_nontrivial = np.count_nonzero(compatible & (self.min_residuals < mag_symprec))
+        num_spin_translations = np.count_nonzero(
+            self.centering_residuals[distinct_indices] < mag_symprec
+        )
+        num_operations = (
+            num_nontrivial * num_spin_translations * np.count_nonzero(is_stg_centering)
+        )
+        return spin_only_group_type, int(num_operations)
+
+    def get_critical_tolerances(self) -> NDArrayFloat:
+        """Return sorted tolerances ``t`` such that :meth:`summarize` differs slightly above ``t`` and at ``t``.
+
+        Summaries change only when tolerances pass over residuals for spin only groups, residuals of centerings, or smallest residuals of coset representatives.
+        """
+        candidates = np.unique(
+            np.concatenate(
+                [
+                    self.spin_only_residuals,
+                    self.identity_residuals,
+                    self.centering_residuals,
+                    self.min_residuals,
+                ]
+            )
+        )
+        candidates = candidates[np.isfinite(candidates)]
+        critical_tolerances = []
+        previous = self.summarize(np.nextafter(0, 1))
+        for candidate in candidates:
+            current = self.summarize(np.nextafter(candidate, np.inf))
+            if current != previous:
+                critical_tolerances.append(candidate)
+            previous = current
+        return np.array(critical_tolerances, dtype=np.float_)
+
+    def _get_spin_only_group(self, mag_symprec: float) -> SpinOnlyGroup:
+        return get_spin_only_group_from_residuals(
+            self.spin_only_residuals, self._parallel_axis, self._vertical_axis, mag_symprec
+        )
+
+    def _get_centering_subgroup(self, mag_symprec: float) -> NDArrayBool:
+        """Return largest subgroup of centerings within ``mag_symprec`` by dropping centerings with large residuals.
+
+        Centerings within a tolerance form a group for exact magnetic moments, but not necessarily near residuals of noisy ones.
+        """
+        is_stg_centering = self.identity_residuals < mag_symprec
+        while True:
+            members = np.nonzero(is_stg_centering)[0]
+            products = self._centering_products[np.ix_(members, members)]
+            closed = np.all(is_stg_centering[products], axis=1)
+            if np.all(closed):
+                return is_stg_centering
+            broken = members[~closed]
+            is_stg_centering[broken[np.argmax(self.identity_residuals[broken])]] = False
+
+    def _get_lattice(self, is_stg_centering: NDArrayBool) -> tuple:
+        """Return :func:`get_spin_translation_lattice` with rotation parts of coset representatives w.r.t. its primitive cell and their compatibility."""
+        key = is_stg_centering.tobytes()
+        if key not in self._lattices:
+            ns = self.nonmagnetic_symmetry
+            lattice = get_spin_translation_lattice(ns, is_stg_centering)
+            tmat_stg = lattice[0]
+            rot_prims = np.linalg.inv(tmat_stg)[None, :, :] @ ns.prim_rotations @ tmat_stg
+            rot_prims = rot_prims.reshape(-1, 3, 3)
+            rot_prims_int = np.around(rot_prims).astype(np.int_)
+            compatible = np.all(
+                np.isclose(rot_prims_int, rot_prims, rtol=1e-5, atol=1e-8), axis=(1, 2)
+            )
+            self._lattices[key] = (*lattice, rot_prims_int, compatible)
+        return self._lattices[key]
+
+    def _get_contained(self, spin_only_group: SpinOnlyGroup) -> tuple[NDArrayBool, NDArrayBool]:
+        """Return if spin rotations of centerings and of all pairs belong to ``spin_only_group``."""
+        key = spin_only_group.spin_only_group_type.value
+        if key not in self._contained:
+            contained = spin_only_group.contain_many(self._rotations.reshape(-1, 3, 3))
+            self._contained[key] = (
+                spin_only_group.contain_many(self._centering_rotations),
+                contained.reshape(self.residuals.shape),
+            )
+        return self._contained[key]
+
+
+def _search_nontrivial_coset(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms: NDArrayFloat,
+    mag_symprec: float,
+    spin_only_group: SpinOnlyGroup,
+    tmat_stg: NDArrayInt,
+    solve: Callable[[NDArrayInt], tuple[NDArrayFloat, NDArrayFloat, int]],
+    deadline: Deadline | None = None,
+) -> tuple[list[SpinSymmetryOperation], int, bool]:
+    """Search one spin symmetry operation for each rotation part compatible with ``tmat_stg``.
+
+    ``solve(perms)`` returns spin rotations for permutations, their residuals, and the number of solved Procrustes problems.
+
+    Found operations are kept closed under products, which are accepted after checking residuals without solving Procrustes problems.
+    A rotation ``R`` is rejected without solving if ``R @ h^-1`` is already rejected for some found rotation ``h``.
+    The search stops before the next coset representative once ``deadline`` is set.
+
+    Returns
+    -------
+    nontrivial_coset: list[SpinSymmetryOperation]
+    num_solves: int
+        Number of solved Procrustes problems
+    is_complete: bool
+        False if the search is stopped by ``deadline``
+    """
+    invtmat_stg = np.linalg.inv(tmat_stg)
+    centering_perms = nonmagnetic_symmetry.prim_centering_permutations.permutations
+    identity = np.eye(3)
+
+    # Closure of found operations keyed by rotation parts: (operation, permutation)
+    closure: dict[tuple, tuple[SpinSymmetryOperation, NDArrayInt]] = {}
+    rejected: set[tuple] = set()
+    num_solves = 0
+
+    def add_to_closure(ops: SpinSymmetryOperation, perm: NDArrayInt):
+        closure[ndarray2d_to_integer_tuple(ops.rotation)] = (ops, perm)
+        queue = [(ops, perm)]
+        while queue:
+            lhs, lhs_perm = queue.pop()
+            for rhs, rhs_perm in list(closure.values()):
+                for (ops1, perm1), (ops2, perm2) in [
+                    ((lhs, lhs_perm), (rhs, rhs_perm)),
+                    ((rhs, rhs_perm), (lhs, lhs_perm)),
+                ]:
+                    product_rotation = ops1.rotation @ ops2.rotation
+                    key = ndarray2d_to_integer_tuple(product_rotation)
+                    if key in closure:
+                        continue
+                    W = ops1.spin_rotation @ ops2.spin_rotation
+                    if spin_only_group.contain(W):
+                        W = identity.copy()
+                    product = SpinSymmetryOperation(
+                        rotation=product_rotation,
+                        translation=ops1.rotation @ ops2.translation + ops1.translation,
+                        spin_rotation=W,
+                    )
+                    closure[key] = (product, perm1[perm2])
+                    queue.append(closure[key])
 
-    # Spin space group search
     nontrivial_coset = []
     for rot, trans, perm in zip(
         nonmagnetic_symmetry.prim_rotations,
         nonmagnetic_symmetry.prim_translations,
-        nonmagnetic_symmetry.prim_permutations,
+        nonmagnetic_symmetry.prim_permutations.permutations,
     ):
+        if deadline is not None and deadline.is_set():
+            return nontrivial_coset, num_solves, False
+
         # Point group symmetry compatible with the primitive cell
         rot_prim = invtmat_stg @ rot @ tmat_stg
         if not is_integer_array(rot_prim):
             continue
+        key = ndarray2d_to_integer_tuple(rot_prim)
 
-        # Need to consider centerings for subgroup
-        for centering, centering_perm in zip(
-            nonmagnetic_symmetry.prim_centerings, nonmagnetic_symmetry.prim_centering_permutations
-        ):
-            new_perm: Permutation = centering_perm * perm
-            new_magmoms = magmoms.copy()
-            perm_magmoms = magmoms[new_perm.permutation]
-            W = solve_procrustes(new_magmoms, perm_magmoms)
-            if spin_only_group.contain(W):
-                # Chose W as identify if W belongs to the spin only group
-                W = np.eye(3, dtype=np.float_)
-
-            new_magmoms = new_magmoms @ W.T
-            if np.max(np.linalg.norm(new_magmoms - perm_magmoms, axis=1)) < mag_symprec:
-                # w.r.t. primitive cell of spin space group
-                new_trans = centering + trans
-                nontrivial_coset.append(
-                    SpinSymmetryOperation(
-                        rotation=rot_prim,
-                        translation=invtmat_stg @ new_trans,
-                        spin_rotation=W,
-                    )
-                )
-                break
+        # Accept products of found operations if they keep magnetic moments within tolerance
+        if key in closure:
+            ops, product_perm = closure[key]
+            residual = get_procrustes_residuals(magmoms, magmoms[product_perm], ops.spin_rotation)
+            if residual < mag_symprec:
+                nontrivial_coset.append(ops)
+                continue
 
-    # Transform centerings to primitive cell of spin space group
-    prim_spin_lattice = tmat_stg.T @ nonmagnetic_symmetry.prim_lattice
+        # Reject coset of found subgroup containing a rejected rotation
+        if len(rejected) > 0 and len(closure) > 0:
+            found_rotations = np.array([ops.rotation for ops, _ in closure.values()])
+            inverses = np.around(np.linalg.inv(found_rotations)).astype(np.int_)
+            if any(ndarray2d_to_integer_tuple(other) in rejected for other in rot_prim @ inverses):
+                rejected.add(key)
+                continue
 
-    return SpinSpaceGroup(
-        prim_lattice=prim_spin_lattice,
-        spin_only_group=spin_only_group,
-        spin_translation_coset=spin_translation_coset,
-        prim_centerings=prim_centerings,
-        nontrivial_coset=nontrivial_coset,
-        transformation=transformation,
+        # Need to consider centerings for subgroup: solve for all (centering * rot) at once
+        new_perms = centering_perms[:, perm]
+        Ws, residuals, num_new_solves = solve(new_perms)
+        num_solves += num_new_solves
+        found = np.nonzero(residuals < mag_symprec)[0]
+        if len(found) == 0:
+            rejected.add(key)
+            continue
+
+        # w.r.t. primitive cell of spin space group
+        new_trans = nonmagnetic_symmetry.prim_centerings[found[0]] + trans
+        ops = SpinSymmetryOperation(
+            rotation=rot_prim,
+            translation=invtmat_stg @ new_trans,
+            spin_rotation=Ws[found[0]],
+        )
+        nontrivial_coset.append(ops)
+        add_to_closure(ops, new_perms[found[0]])
+
+    return nontrivial_coset, num_solves, True
+
+
+def _solve_spin_rotations(
+    magmoms: NDArrayFloat,
+    perms: NDArrayInt,
+    spin_only_group: SpinOnlyGroup,
+    mag_symprec: float,
+    staged: bool = False,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> tuple[NDArrayFloat, NDArrayFloat, int]:
+    """Return spin rotations ``W[k]`` with ``magmoms @ W[k].T ~ magmoms[perms[k]]`` and their residuals.
+
+    ``W[k]`` is chosen as identity if it belongs to ``spin_only_group``.
+    Permutations rejected by :func:`prefilter_permutations` are not solved and have infinite residuals.
+    If ``staged`` is true, permutations rejected by :func:`_verify_from_anchors` also have infinite residuals.
+
+    Returns
+    -------
+    Ws: array, (K, 3, 3)
+    residuals: array, (K, )
+    num_solves: int
+        Number of solved Procrustes problems
+    """
+    num_sites = magmoms.shape[0]
+    Ws = np.tile(np.eye(3), (len(perms), 1, 1))
+    residuals = np.full(len(perms), np.inf)
+    survivors = np.nonzero(prefilter_permutations(magmoms, perms, mag_symprec))[0]
+    num_solves = len(survivors)
+    if staged:
+        survivors = survivors[_verify_from_anchors(magmoms, perms[survivors], mag_symprec)]
+        num_solves += len(survivors)
+    # Permuted moments and their differences dominate temporary arrays
+    chunk = max(1, max_memory // (72 * max(num_sites, 1)))
+    for start in range(0, len(survivors), chunk):
+        indices = survivors[start : start + chunk]
+        perm_magmoms = magmoms[perms[indices]]  # (chunk, N, 3)
+        W, residual = solve_procrustes_batch(magmoms, perm_magmoms)
+        in_spin_only_group = spin_only_group.contain_many(W)
+        if np.any(in_spin_only_group):
+            # Chose W as identify if W belongs to the spin only group
+            W[in_spin_only_group] = np.eye(3)
+            residual[in_spin_only_group] = get_procrustes_residuals(
+                magmoms, perm_magmoms[in_spin_only_group], np.eye(3)
+            )
+        Ws[indices] = W
+        residuals[indices] = residual
+    return Ws, residuals, num_solves
+
+
+def _solve_collinear_spin_rotations(
+    magmoms: NDArrayFloat,
+    perms: NDArrayInt,
+    axis: NDArrayFloat,
+    mag_symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> tuple[NDArrayFloat, NDArrayFloat, int]:
+    """Return spin rotations for collinear ``magmoms`` in the same form as :func:`_solve_spin_rotations`.
+
+    Up to the collinear spin-only group, a spin rotation is identity or ``I - 2 * axis axis^T``, which flips moments.
+    Each permutation is tested by comparing projected moments ``s[perm]`` with ``s`` and ``-s``, and residuals are evaluated only for the chosen spin rotation.
+    No Procrustes problem is solved.
+    """
+    num_sites = magmoms.shape[0]
+    flip = np.eye(3) - 2 * np.outer(axis, axis)
+    Ws = np.tile(np.eye(3), (len(perms), 1, 1))
+    residuals = np.full(len(perms), np.inf)
+
+    projected = magmoms @ axis  # (N, )
+    perm_projected = projected[perms]  # (K, N)
+    keep = np.max(np.abs(perm_projected - projected[None, :]), axis=1, initial=0) < mag_symprec
+    flipped = ~keep & (
+        np.max(np.abs(perm_projected + projected[None, :]), axis=1, initial=0) < mag_symprec
     )
+    Ws[flipped] = flip
+
+    candidates = np.nonzero(keep | flipped)[0]
+    chunk = max(1, max_memory // (72 * max(num_sites, 1)))
+    for start in range(0, len(candidates), chunk):
+        indices = candidates[start : start + chunk]
+        residuals[indices] = get_procrustes_residuals(
+            magmoms, magmoms[perms[indices]], Ws[indices]
+        )
+    return Ws, residuals, 0
+
+
+def _solve_coplanar_spin_rotations(
+    magmoms: NDArrayFloat,
+    perms: NDArrayInt,
+    spin_only_group: SpinOnlyGroup,
+    mag_symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> tuple[NDArrayFloat, NDArrayFloat, int]:
+    """Return spin rotations for coplanar ``magmoms`` in the same form as :func:`_solve_spin_rotations`.
+
+    Moments are represented as complex numbers ``z`` in the plane perpendicular to the axis of ``spin_only_group``.
+    Up to the coplanar spin-only group, a spin rotation acts on the plane as ``z -> exp(i phi) z`` or ``z -> exp(i phi) conj(z)`` and keeps the axis.
+    The least-squares phase of each case is the argument of ``sum(conj(z) * z[perm])`` or ``sum(z * z[perm])``, and the case with the larger modulus is chosen.
+    No Procrustes problem is solved.
+    """
+    num_sites = magmoms.shape[0]
+    normal = spin_only_group.axis
+    assert normal is not None
+    # Orthonormal basis (e1, e2, normal) with in-plane e1 and e2
+    e1 = np.cross(normal, np.eye(3)[np.argmin(np.abs(normal))])
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(normal, e1)
+    basis = np.stack([e1, e2, normal], axis=1)  # (3, 3)
+
+    z = magmoms @ e1 + 1j * (magmoms @ e2)  # (N, )
+    perm_z = z[perms]  # (K, N)
+    rotated = perm_z @ np.conj(z)  # (K, )
+    reflected = perm_z @ z  # (K, )
+    is_reflection = np.abs(reflected) > np.abs(rotated)
+    phases = np.angle(np.where(is_reflection, reflected, rotated))
+
+    # Spin rotations in (e1, e2, normal) basis
+    cos, sin = np.cos(phases), np.sin(phases)
+    sign = np.where(is_reflection, -1, 1)
+    local = np.zeros((len(perms), 3, 3))
+    local[:, 0, 0] = cos
+    local[:, 0, 1] = -sin * sign
+    local[:, 1, 0] = sin
+    local[:, 1, 1] = cos * sign
+    local[:, 2, 2] = 1
+    Ws = basis[None, :, :] @ local @ basis.T[None, :, :]
+    # Chose W as identify if W belongs to the spin only group
+    Ws[spin_only_group.contain_many(Ws)] = np.eye(3)
+
+    residuals = np.empty(len(perms))
+    chunk = max(1, max_memory // (72 * max(num_sites, 1)))
+    for start in range(0, len(perms), chunk):
+        residuals[start : start + chunk] = get_procrustes_residuals(
+            magmoms, magmoms[perms[start : start + chunk]], Ws[start : start + chunk]
+        )
+    return Ws, residuals, 0
+
+
+def get_anchor_sites(magmoms: NDArrayFloat, mag_symprec: float) -> NDArrayInt:
+    """Return up to three sites whose magnetic moments are linearly independent.
+
+    Sites are chosen greedily by the largest component orthogonal to moments of already chosen sites, which is no less than ``mag_symprec``.
+    """
+    anchors: list[int] = []
+    residuals = np.array(magmoms, dtype=np.float_)
+    for _ in range(3):
+        norms = np.linalg.norm(residuals, axis=1)
+        idx = int(np.argmax(norms))
+        if norms[idx] < mag_symprec:
+            break
+        anchors.append(idx)
+        # Gram-Schmidt
+        direction = residuals[idx] / norms[idx]
+        residuals -= (residuals @ direction)[:, None] * direction[None, :]
+    return np.array(anchors, dtype=np.int_)
+
+
+def _verify_from_anchors(
+    magmoms: NDArrayFloat,
+    perms: NDArrayInt,
+    mag_symprec: float,
+    initial_block_size: int = 64,
+    seed: int = 0,
+) -> NDArrayBool:
+    """Return mask of permutations passing staged verification.
+
+    A spin rotation ``W_A`` is solved only from moments at anchor sites from :func:`get_anchor_sites`.
+    Then, residuals with ``W_A`` are checked on blocks of sites with doubling sizes in a fixed random order.
+    Permutations are dropped at the first block with a residual beyond a bound that the Procrustes solution ``W`` with all sites cannot satisfy within ``mag_symprec``.
+
+    If ``W`` satisfies the tolerance, both ``W`` and ``W_A`` fit ``k`` anchors within ``sqrt(k) * mag_symprec`` in Frobenius norm.
+    Thus, ``|(W_A - W) @ m| <= 2 * sqrt(k) * mag_symprec * |P m| / sigma + 2 * |m - P m|``, where ``P`` is the projection onto the span of anchors and ``sigma`` is the smallest nonzero singular value of the anchor moments.
+    A site violates the bound if its residual with ``W_A`` exceeds ``mag_symprec`` plus the above.
+    """
+    num_sites = magmoms.shape[0]
+    anchors = get_anchor_sites(magmoms, mag_symprec)
+    if len(anchors) == 0:
+        # Nonmagnetic arrangement
+        return np.ones(len(perms), dtype=bool)
+    Ws, _ = solve_procrustes_batch(magmoms[anchors], magmoms[perms[:, anchors]])
+
+    # Per-site bounds of residuals with W_A
+    _, singular_values, vt = np.linalg.svd(magmoms[anchors], full_matrices=False)
+    projected = magmoms @ vt.T  # (N, k)
+    orthogonal = np.linalg.norm(magmoms - projected @ vt, axis=1)
+    bounds = (
+        mag_symprec
+        + 2
+        * np.sqrt(len(anchors))
+        * mag_symprec
+        * np.linalg.norm(projected, axis=1)
+        / singular_values[-1]
+        + 2 * orthogonal
+    )
+
+    order = np.random.default_rng(seed).permutation(num_sites)
+    active = np.arange(len(perms))
+    start = 0
+    block_size = initial_block_size
+    while start < num_sites and len(active) > 0:
+        sites = order[start : start + block_size]
+        diffs = magmoms[sites] @ np.swapaxes(Ws[active], 1, 2) - magmoms[perms[active][:, sites]]
+        active = active[np.all(np.linalg.norm(diffs, axis=2) < bounds[sites], axis=1)]
+        start += block_size
+        block_size *= 2
+
+    mask = np.zeros(len(perms), dtype=bool)
+    mask[active] = True
+    return mask
+
+
+def prefilter_permutations(
+    magmoms: NDArrayFloat,
+    perms: NDArrayInt,
+    mag_symprec: float,
+    num_anchors: int = 4,
+) -> NDArrayBool:
+    """Return mask of permutations which may map ``magmoms`` to ``magmoms[perm]`` by a spin rotation.
+
+    A spin rotation ``W`` with ``max_i |W @ m_i - m_perm(i)| < mag_symprec`` keeps per-site magnitudes, ``| |m_perm(i)| - |m_i| | < mag_symprec``, and inner products, ``|m_perm(a) . m_perm(b) - m_a . m_b| < mag_symprec * (|m_a| + |m_b|) + mag_symprec**2``.
+    The latter is checked only for ``num_anchors`` sites with the largest magnitudes.
+    Thus, rejected permutations never satisfy the tolerance in :func:`get_primitive_spin_symmetry`.
+
+    Parameters
+    ----------
+    magmoms: array, (num_sites, 3)
+    perms: array[int], (K, num_sites)
+    mag_symprec: float
+    num_anchors: int, default=4
+
+    Returns
+    -------
+    mask: array[bool], (K, )
+    """
+    perms = np.asarray(perms)
+    norms = np.linalg.norm(magmoms, axis=1)
+    mask = np.max(np.abs(norms[perms] - norms[None, :]), axis=1, initial=0) < mag_symprec
+
+    if num_anchors > 0 and np.any(mask):
+        anchors = np.argsort(-norms, kind="stable")[:num_anchors]
+        gram = magmoms[anchors] @ magmoms[anchors].T
+        perm_anchors = magmoms[perms[mask][:, anchors]]  # (K', num_anchors, 3)
+        perm_gram = np.einsum("kai,kbi->kab", perm_anchors, perm_anchors)
+        bound = (
+            mag_symprec * (norms[anchors][:, None] + norms[anchors][None, :]) + mag_symprec**2
+        )
+        mask[mask] = np.all(np.abs(perm_gram - gram[None, :, :]) < bound[None, :, :], axis=(1, 2))
+
+    return mask
@@ -0,0 +1,215 @@
+"""Incremental update of spin symmetry under local changes of magnetic moments."""
+from __future__ import annotations
+
+import numpy as np
+
+from spinspg.group import (
+    NonmagneticSymmetry,
+    SpinSpaceGroup,
+    get_operations_in_cell,
+    get_primitive_spin_symmetry,
+)
+from spinspg.spin import solve_procrustes_batch
+from spinspg.utils import NDArrayBool, NDArrayFloat, NDArrayInt
+
+
+class IncrementalSpinSymmetry:
+    """Spin symmetry of a spin arrangement updated after changes of a few magnetic moments.
+
+    The ``k``-th spatial operation in input cell with permutation ``p`` is a spin symmetry operation iff the solution ``W`` of the Procrustes problem between ``magmoms`` and ``magmoms[p]`` satisfies ``|W @ magmoms[i] - magmoms[p[i]]| < mag_symprec`` for all sites, as in :func:`group.get_primitive_spin_symmetry`.
+    For each operation, this object keeps the cross-covariance matrix of the Procrustes problem, a spin rotation ``W``, per-site residuals with ``W``, and numbers of sites violating ``mag_symprec`` and thresholds slightly below and above it.
+    Changing moments at sites ``S`` updates them only for pairs of sites involving ``S`` or ``p^{-1}[S]``, with O(num_operations * |S|) cost.
+    On a query, the Procrustes problems are solved from the cross-covariance matrices with O(num_operations) cost.
+    An operation is rejected with O(1) cost if the root mean square of per-site residuals, obtained from the singular values of its cross-covariance matrix, is at least ``mag_symprec + margin``.
+    Per-site residuals of the other operations are recomputed with O(num_sites) cost only if the change of ``W`` on the span of moments is too large to decide membership from the violation counts.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`
+    magmoms: array, (num_sites, 3)
+        Initial magnetic moments
+    mag_symprec: float
+    margin: float, optional
+        Half width of the band of residuals around ``mag_symprec`` in which membership is recomputed. Default to ``mag_symprec / 2``.
+
+    Attributes
+    ----------
+    permutations: array[int], (num_operations, num_sites)
+        Permutations of operations modulo lattice translations of input cell, see :func:`group.get_operations_in_cell`
+    num_recomputations: int
+        Number of operations whose per-site residuals are recomputed so far
+    """
+
+    def __init__(
+        self,
+        nonmagnetic_symmetry: NonmagneticSymmetry,
+        magmoms: NDArrayFloat,
+        mag_symprec: float,
+        margin: float | None = None,
+    ):
+        self._nonmagnetic_symmetry = nonmagnetic_symmetry
+        self._mag_symprec = mag_symprec
+        self._margin = 0.5 * mag_symprec if margin is None else margin
+        assert 0 <= self._margin < mag_symprec
+
+        _, _, self.permutations = get_operations_in_cell(nonmagnetic_symmetry)
+        num_operations, num_sites = self.permutations.shape
+        self._inverse_permutations = np.empty_like(self.permutations)
+        rows = np.arange(num_operations)[:, None]
+        self._inverse_permutations[rows, self.permutations] = np.arange(num_sites)[None, :]
+        self.num_recomputations = 0
+
+        self._magmoms = np.array(magmoms, dtype=np.float_)
+        assert self._magmoms.shape == (num_sites, 3)
+        self.refresh()
+
+    @property
+    def magmoms(self) -> NDArrayFloat:
+        """Return current magnetic moments (read-only view)."""
+        view = self._magmoms.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def num_operations(self) -> int:
+        """Return number of spatial operations modulo lattice translations of input cell."""
+        return len(self.permutations)
+
+    def refresh(self):
+        """Recompute all quantities from current magnetic moments, e.g., to drop accumulated rounding errors."""
+        magmoms = self._magmoms
+        permuted = magmoms[self.permutations]  # (K, N, 3)
+        self._covariances = np.einsum("kni,nj->kij", permuted, magmoms, optimize="greedy")
+        self._gram = magmoms.T @ magmoms
+        self._max_norm = np.max(np.linalg.norm(magmoms, axis=1), initial=0)
+        self._spin_rotations, _ = solve_procrustes_batch(magmoms[None, :, :], permuted)
+        self._residuals = np.zeros(self.permutations.shape)
+        self._num_near = np.zeros(self.num_operations, dtype=np.int_)
+        self._num_violations = np.zeros(self.num_operations, dtype=np.int_)
+        self._num_far = np.zeros(self.num_operations, dtype=np.int_)
+        self._recompute(np.arange(self.num_operations))
+
+    def update(self, sites: NDArrayInt, magmoms: NDArrayFloat):
+        """Replace magnetic moments at ``sites`` by ``magmoms``.
+
+        Parameters
+        ----------
+        sites: array[int], (num_changes, )
+        magmoms: array, (num_changes, 3)
+        """
+        sites = np.atleast_1d(np.asarray(sites, dtype=np.int_))
+        magmoms = np.asarray(magmoms, dtype=np.float_).reshape(-1, 3)
+        sites, first = np.unique(sites, return_index=True)
+        magmoms = magmoms[first]
+
+        # Pairs of sites (i, p[i]) involving changed sites without duplicates
+        changed = np.broadcast_to(sites, (self.num_operations, len(sites)))
+        pairs = np.concatenate(
+            [changed, self._inverse_permutations[:, sites]], axis=1
+        )  # (K, 2 * num_changes)
+        pairs = np.sort(pairs, axis=1)
+        weights = np.ones(pairs.shape, dtype=np.float_)
+        weights[:, 1:][pairs[:, 1:] == pairs[:, :-1]] = 0
+        images = np.take_along_axis(self.permutations, pairs, axis=1)
+
+        self._add_pairs(pairs, images, -weights)
+        self._gram -= self._magmoms[sites].T @ self._magmoms[sites]
+        self._magmoms[sites] = magmoms
+        self._gram += magmoms.T @ magmoms
+        self._max_norm = max(self._max_norm, np.max(np.linalg.norm(magmoms, axis=1), initial=0))
+        self._add_pairs(pairs, images, weights)
+
+    def get_valid_operations(self) -> NDArrayBool:
+        """Return if each spatial operation admits a spin rotation for current magnetic moments.
+
+        Returns
+        -------
+        valid: array[bool], (num_operations, )
+        """
+        optimal, singular_values = _solve_procrustes_from_covariances(self._covariances)
+
+        # Root mean square of per-site residuals with W* is a lower bound of the largest one
+        squared_errors = 2 * np.trace(self._gram) - 2 * np.sum(singular_values, axis=1)
+        num_sites = self.permutations.shape[1]
+        rms = np.sqrt(np.maximum(squared_errors, 0) / max(num_sites, 1))
+        rejected = rms >= self._mag_symprec + self._margin
+
+        # Upper bound of |(W* - W) @ m| for all moments m
+        eigvals, eigvecs = np.linalg.eigh(self._gram)
+        span = eigvecs[:, eigvals > 1e-12 * max(eigvals[-1], np.finfo(float).tiny)]
+        diff = (optimal - self._spin_rotations) @ span[None, :, :]
+        if span.shape[1] > 0:
+            deviations = np.linalg.norm(diff, ord=2, axis=(1, 2)) * self._max_norm
+        else:
+            deviations = np.zeros(self.num_operations)
+
+        # With |(W* - W) @ m| <= margin, residuals below (above) the band stay below (above) mag_symprec
+        decided = rejected | (
+            (deviations <= self._margin) & ((self._num_near == 0) | (self._num_far > 0))
+        )
+        valid = (self._num_near == 0) & ~rejected
+        undecided = np.nonzero(~decided)[0]
+        if len(undecided) > 0:
+            self._spin_rotations[undecided] = optimal[undecided]
+            self._recompute(undecided)
+            valid[undecided] = self._num_violations[undecided] == 0
+        return valid
+
+    def get_spin_rotations(self) -> NDArrayFloat:
+        """Return Procrustes solutions of spin rotations for all spatial operations, (num_operations, 3, 3)."""
+        optimal, _ = _solve_procrustes_from_covariances(self._covariances)
+        return optimal
+
+    def get_spin_space_group(self) -> SpinSpaceGroup:
+        """Return spin space group of current magnetic moments with O(num_sites) cost per operation."""
+        return get_primitive_spin_symmetry(
+            self._nonmagnetic_symmetry, self._magmoms, self._mag_symprec
+        )
+
+    def _add_pairs(self, pairs: NDArrayInt, images: NDArrayInt, weights: NDArrayFloat):
+        """Add contributions of pairs ``(pairs[k, j], images[k, j])`` with ``weights``."""
+        sources = self._magmoms[pairs]  # (K, P, 3)
+        targets = self._magmoms[images]  # (K, P, 3)
+        self._covariances += np.einsum(
+            "kp,kpi,kpj->kij", weights, targets, sources, optimize="greedy"
+        )
+
+        # Per-site residuals with fixed spin rotations
+        residuals = np.linalg.norm(
+            sources @ np.swapaxes(self._spin_rotations, 1, 2) - targets, axis=2
+        )
+        if np.all(weights >= 0):
+            rows = np.arange(self.num_operations)[:, None]
+            self._residuals[rows, pairs] = residuals
+        signs = np.sign(weights).astype(np.int_)
+        for counts, threshold in self._get_thresholds():
+            counts += np.sum(signs * (residuals >= threshold), axis=1)
+
+    def _recompute(self, indices: NDArrayInt):
+        """Recompute per-site residuals of operations at ``indices`` with current spin rotations."""
+        permuted = self._magmoms[self.permutations[indices]]  # (k, N, 3)
+        residuals = np.linalg.norm(
+            self._magmoms[None, :, :] @ np.swapaxes(self._spin_rotations[indices], 1, 2)
+            - permuted,
+            axis=2,
+        )
+        self._residuals[indices] = residuals
+        for counts, threshold in self._get_thresholds():
+            counts[indices] = np.sum(residuals >= threshold, axis=1)
+        self.num_recomputations += len(indices)
+
+    def _get_thresholds(self) -> list[tuple[NDArrayInt, float]]:
+        """Return violation counts with their thresholds of residuals."""
+        return [
+            (self._num_near, self._mag_symprec - self._margin),
+            (self._num_violations, self._mag_symprec),
+            (self._num_far, self._mag_symprec + self._margin),
+        ]
+
+
+def _solve_procrustes_from_covariances(
+    covariances: NDArrayFloat,
+) -> tuple[NDArrayFloat, NDArrayFloat]:
+    """Return Procrustes solutions and singular values for stacked cross-covariance matrices."""
+    u, s, vt = np.linalg.svd(covariances)
+    return u @ vt, s
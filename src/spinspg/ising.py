@@ -0,0 +1,182 @@
+"""Symmetry screening of collinear up/down spin arrangements stored as packed bits."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import NDArray
+
+from spinspg.group import NonmagneticSymmetry, get_operations_in_cell
+from spinspg.permutation import DEFAULT_MAX_MEMORY
+from spinspg.utils import NDArrayBool, NDArrayFloat, NDArrayInt
+
+
+@dataclass
+class IsingSymmetryClasses:
+    """Classification of up/down spin arrangements by their spin symmetry operations.
+
+    For a collinear spin arrangement, a spatial operation either keeps all spins, flips all spins, or is not a spin symmetry operation.
+    Spin arrangements with the same label have the same spin symmetry operations.
+
+    Attributes
+    ----------
+    labels: array[int], (num_configurations, )
+        Class of each spin arrangement
+    keep: array[bool], (num_classes, num_operations)
+        ``keep[c, k]`` is true iff the ``k``-th operation keeps spin arrangements in the ``c``-th class.
+        A spin symmetry operation is given by this operation with identity spin rotation.
+    flip: array[bool], (num_classes, num_operations)
+        ``flip[c, k]`` is true iff the ``k``-th operation flips all spins in the ``c``-th class.
+        A spin symmetry operation is given by this operation with spin rotation reversing the collinear axis.
+    rotations: array[int], (num_operations, 3, 3)
+        Rotation parts of operations w.r.t. input cell
+    translations: array, (num_operations, 3)
+        Translation parts of operations w.r.t. input cell
+    """
+
+    labels: NDArrayInt
+    keep: NDArrayBool
+    flip: NDArrayBool
+    rotations: NDArrayInt
+    translations: NDArrayFloat
+
+    @property
+    def num_classes(self) -> int:
+        """Return number of distinct classes."""
+        return len(self.keep)
+
+
+def get_ising_symmetry_classes(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    packed_configurations: NDArray,
+    chunk_size: int = 1 << 14,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> IsingSymmetryClasses:
+    """Classify up/down spin arrangements on a fixed crystal structure by their spin symmetry.
+
+    The first byte of each arrangement permuted by each operation is gathered from uint8 lookup tables indexed by packed bytes, with ``ceil(num_sites / 8) * 256 * num_operations`` entries.
+    Pairs of arrangements and operations whose first permuted byte matches neither the arrangement nor its flip are rejected.
+    For the remaining pairs, all bits are permuted from ``np.unpackbits`` and compared after ``np.packbits``.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`
+        Symmetry of the crystal structure from :func:`group.get_symmetry_with_cell`
+    packed_configurations: array[uint8], (num_configurations, ceil(num_sites / 8))
+        Spin arrangements packed by ``np.packbits(spins, axis=1)``, where ``spins[k, i]`` is one for up and zero for down spin at the ``i``-th site.
+        Padding bits are ignored.
+    chunk_size: int, default=16384
+        Maximum number of spin arrangements processed at once
+    max_memory: int, default=DEFAULT_MAX_MEMORY
+        Upper bound in bytes of temporary arrays except for the lookup tables.
+        Half of it is for heads and flags of each chunk of arrangements, and the other half is for gathered bits of each block of remaining pairs.
+
+    Returns
+    -------
+    classes: :class:`IsingSymmetryClasses`
+    """
+    packed_configurations = np.asarray(packed_configurations, dtype=np.uint8)
+    rotations, translations, perms = get_operations_in_cell(nonmagnetic_symmetry)
+    num_operations, num_sites = perms.shape
+    num_bytes = (num_sites + 7) // 8
+    assert packed_configurations.shape[1] == num_bytes
+
+    head_tables = _get_head_tables(perms)  # (num_bytes, 256, num_operations)
+    # Mask for padding bits
+    valid = np.packbits(np.ones(num_sites, dtype=np.uint8))
+    # Heads, flags, masks, and int64 indices of remaining pairs for all operations
+    chunk_size = max(1, min(chunk_size, max_memory // (32 * max(num_operations, 1))))
+    # Permutations and permuted bits of remaining pairs
+    block_size = max(1, max_memory // (18 * max(num_sites, 1)))
+
+    num_configurations = len(packed_configurations)
+    labels = np.empty(num_configurations, dtype=np.int_)
+    signatures: dict[bytes, int] = {}
+    keep_list: list[NDArrayBool] = []
+    flip_list: list[NDArrayBool] = []
+    for start in range(0, num_configurations, chunk_size):
+        packed = packed_configurations[start : start + chunk_size] & valid[None, :]
+        flipped = ~packed & valid[None, :]
+
+        # Reject most pairs of arrangements and operations by the first permuted byte
+        head = head_tables[0][packed[:, 0]]
+        for b in range(1, num_bytes):
+            head |= head_tables[b][packed[:, b]]
+        candidates = np.flatnonzero((head == packed[:, :1]) | (head == flipped[:, :1]))
+        del head
+
+        # Gather all bits only for remaining pairs
+        bits = np.unpackbits(packed, axis=1, count=num_sites)
+        keep = np.zeros((len(packed), num_operations), dtype=bool)
+        flip = np.zeros((len(packed), num_operations), dtype=bool)
+        for block_start in range(0, len(candidates), block_size):
+            rows, ks = np.divmod(
+                candidates[block_start : block_start + block_size], num_operations
+            )
+            permuted = np.packbits(bits[rows[:, None], perms[ks]], axis=1)
+            keep[rows, ks] = np.all(permuted == packed[rows], axis=1)
+            flip[rows, ks] = np.all(permuted == flipped[rows], axis=1)
+
+        # Label distinct signatures in order of first appearance
+        keys = np.concatenate([np.packbits(keep, axis=1), np.packbits(flip, axis=1)], axis=1)
+        first_indices, inverse = _get_unique_rows(keys)
+        unique_labels = np.empty(len(first_indices), dtype=np.int_)
+        for u in np.argsort(first_indices):
+            i = first_indices[u]
+            label = signatures.setdefault(keys[i].tobytes(), len(signatures))
+            if label == len(keep_list):
+                keep_list.append(keep[i])
+                flip_list.append(flip[i])
+            unique_labels[u] = label
+        labels[start : start + len(packed)] = unique_labels[inverse]
+
+    return IsingSymmetryClasses(
+        labels=labels,
+        keep=np.array(keep_list, dtype=bool).reshape(-1, num_operations),
+        flip=np.array(flip_list, dtype=bool).reshape(-1, num_operations),
+        rotations=rotations,
+        translations=translations,
+    )
+
+
+def _get_head_tables(perms: NDArrayInt) -> NDArray:
+    """Return lookup tables of the first byte of permuted arrangements.
+
+    The first byte of an arrangement with packed bytes ``x`` permuted by the ``k``-th operation is the bitwise OR of ``tables[b, x[b], k]`` over bytes ``b``.
+    The ``i``-th bit of a permuted arrangement is the ``perms[k, i]``-th bit of the original one.
+    """
+    num_operations, num_sites = perms.shape
+    num_bytes = (num_sites + 7) // 8
+    # byte_bits[v, r] is the r-th bit from the most significant one of byte v
+    byte_bits = (np.arange(256)[:, None] >> np.arange(7, -1, -1)[None, :]) & 1
+    tables = np.zeros((num_bytes, 256, num_operations), dtype=np.uint8)
+    operations = np.arange(num_operations)
+    for i in range(min(8, num_sites)):
+        source = perms[:, i]
+        # Each operation appears once for each target bit
+        tables[source >> 3, :, operations] |= (byte_bits[:, source & 7].T << (7 - i)).astype(
+            np.uint8
+        )
+    return tables
+
+
+def _get_unique_rows(keys: NDArray) -> tuple[NDArrayInt, NDArrayInt]:
+    """Return indices of first occurrences of distinct rows of ``keys`` and inverse indices."""
+    # Hash rows to 64-bit integers, and compare rows with the same hash
+    num_words = (keys.shape[1] + 7) // 8
+    padded = np.zeros((len(keys), 8 * num_words), dtype=np.uint8)
+    padded[:, : keys.shape[1]] = keys
+    # Mix each word with its position as splitmix64
+    z = padded.view(np.uint64) + np.arange(1, num_words + 1, dtype=np.uint64) * np.uint64(
+        0x9E3779B97F4A7C15
+    )
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    hashes = np.bitwise_xor.reduce(z, axis=1)
+    _, first_indices, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    inverse = np.asarray(inverse).reshape(-1)
+    if not np.all(keys == keys[first_indices[inverse]]):
+        _, first_indices, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        inverse = np.asarray(inverse).reshape(-1)
+    return first_indices, inverse
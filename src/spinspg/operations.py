@@ -0,0 +1,207 @@
+"""Spin symmetry operations kept as products of cosets."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from spinspg.group import SpinSpaceGroup
+from spinspg.spin import SpinOnlyGroup
+from spinspg.utils import NDArrayFloat, NDArrayInt
+
+
+@dataclass
+class SpinSymmetryOperations:
+    """Spin symmetry operations w.r.t. input cell without expanding products of cosets.
+
+    The ``i``-th operation with ``i = (a * num_spin_translations + b) * num_centerings + c`` is a product of the ``a``-th operation in nontrivial coset, the ``b``-th operation in spin translation coset, and the ``c``-th centering translation.
+    Memory usage is proportional to sizes of the cosets until operations are expanded by :meth:`to_arrays`, indexing, or :meth:`iter_chunks`.
+    Each access returns ``(rotations, translations, spin_rotations)`` in the same form as :func:`core.get_spin_symmetry`.
+
+    Attributes
+    ----------
+    spin_only_group: :class:`spin.SpinOnlyGroup`
+    rotations: array[int], (num_nontrivial, 3, 3)
+        Rotation parts of nontrivial coset w.r.t. input cell
+    translations: array, (num_nontrivial, 3)
+        Translation parts of nontrivial coset w.r.t. primitive cell
+    spin_rotations: array, (num_nontrivial, 3, 3)
+        Spin rotation parts of nontrivial coset
+    spin_translations: array, (num_spin_translations, 3)
+        Translation parts of spin translation coset w.r.t. primitive cell
+    spin_translation_rotations: array, (num_spin_translations, 3, 3)
+        Spin rotation parts of spin translation coset
+    centerings: array, (num_centerings, 3)
+        Centering translations w.r.t. primitive cell
+    transformation: array[int], (3, 3)
+        Transformation matrix from primitive to given cell
+    is_partial: bool
+        True if the search is stopped by a deadline. Then operations are verified but may not form a group.
+    """
+
+    spin_only_group: SpinOnlyGroup
+    rotations: NDArrayInt
+    translations: NDArrayFloat
+    spin_rotations: NDArrayFloat
+    spin_translations: NDArrayFloat
+    spin_translation_rotations: NDArrayFloat
+    centerings: NDArrayFloat
+    transformation: NDArrayInt
+    is_partial: bool = False
+
+    @classmethod
+    def from_spin_space_group(cls, ssg: SpinSpaceGroup) -> SpinSymmetryOperations:
+        """Keep cosets of ``ssg`` with rotation parts transformed to input cell."""
+        tmat = ssg.transformation
+        invtmat = np.linalg.inv(tmat)
+        # Nontrivial coset may be empty for partial results
+        prim_rotations = np.array([ops.rotation for ops in ssg.nontrivial_coset]).reshape(-1, 3, 3)
+        rotations = np.around(
+            np.einsum("ij,kjl,lm->kim", invtmat, prim_rotations, tmat, optimize=True)
+        ).astype(np.int_)
+        return cls(
+            spin_only_group=ssg.spin_only_group,
+            rotations=rotations,
+            translations=np.array([ops.translation for ops in ssg.nontrivial_coset]).reshape(
+                -1, 3
+            ),
+            spin_rotations=np.array([ops.spin_rotation for ops in ssg.nontrivial_coset]).reshape(
+                -1, 3, 3
+            ),
+            spin_translations=np.array([ops.translation for ops in ssg.spin_translation_coset]),
+            spin_translation_rotations=np.array(
+                [ops.spin_rotation for ops in ssg.spin_translation_coset]
+            ),
+            centerings=np.array(ssg.prim_centerings, dtype=np.float_).reshape(-1, 3),
+            transformation=tmat,
+            is_partial=ssg.is_partial,
+        )
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        """Return sizes of nontrivial coset, spin translation coset, and centerings."""
+        return (len(self.rotations), len(self.spin_translations), len(self.centerings))
+
+    def __len__(self) -> int:
+        """Return number of spin symmetry operations."""
+        num_nontrivial, num_spin_translations, num_centerings = self.shape
+        return num_nontrivial * num_spin_translations * num_centerings
+
+    def __getitem__(
+        self, idx: int | slice | NDArrayInt
+    ) -> tuple[NDArrayInt, NDArrayFloat, NDArrayFloat]:
+        """Return ``(rotation, translation, spin_rotation)`` of the ``idx``-th operation.
+
+        If ``idx`` is a slice or an integer array, stacked parts of selected operations are returned.
+        """
+        if isinstance(idx, slice):
+            return self.take(np.arange(len(self))[idx])
+        if np.ndim(idx) == 0:
+            i = int(idx)  # type: ignore
+            if i < 0:
+                i += len(self)
+            if not (0 <= i < len(self)):
+                raise IndexError(f"Index {idx} out of range for {len(self)} operations")
+            rotations, translations, spin_rotations = self.take(np.array([i]))
+            return rotations[0], translations[0], spin_rotations[0]
+        return self.take(np.asarray(idx))
+
+    def __iter__(self) -> Iterator[tuple[NDArrayInt, NDArrayFloat, NDArrayFloat]]:
+        """Iterate over ``(rotation, translation, spin_rotation)`` of each operation."""
+        for rotations, translations, spin_rotations in self.iter_chunks():
+            yield from zip(rotations, translations, spin_rotations)
+
+    def iter_chunks(
+        self, chunk_size: int = 1 << 12
+    ) -> Iterator[tuple[NDArrayInt, NDArrayFloat, NDArrayFloat]]:
+        """Iterate over stacked parts of at most ``chunk_size`` consecutive operations."""
+        for start in range(0, len(self), chunk_size):
+            yield self.take(np.arange(start, min(start + chunk_size, len(self))))
+
+    def take(self, indices: NDArrayInt) -> tuple[NDArrayInt, NDArrayFloat, NDArrayFloat]:
+        """Return stacked parts of operations at ``indices``."""
+        indices = np.asarray(indices, dtype=np.int_)
+        if len(indices) == 0:
+            return np.zeros((0, 3, 3), dtype=np.int_), np.zeros((0, 3)), np.zeros((0, 3, 3))
+        idx_nontrivial, idx_spin_translation, idx_centering = np.unravel_index(indices, self.shape)
+        invtmat = np.linalg.inv(self.transformation)
+        prim_translations = (
+            self.translations[idx_nontrivial]
+            + self.spin_translations[idx_spin_translation]
+            + self.centerings[idx_centering]
+        )
+        translations = np.remainder(prim_translations @ invtmat.T, 1)
+        spin_rotations = (
+            self.spin_translation_rotations[idx_spin_translation]
+            @ self.spin_rotations[idx_nontrivial]
+        )
+        return self.rotations[idx_nontrivial], translations, spin_rotations
+
+    def to_arrays(
+        self,
+        out: tuple[NDArrayInt, NDArrayFloat, NDArrayFloat] | None = None,
+    ) -> tuple[NDArrayInt, NDArrayFloat, NDArrayFloat]:
+        """Return ``(rotations, translations, spin_rotations)`` of all operations.
+
+        Products of cosets are expanded by broadcasting without Python loops.
+
+        Parameters
+        ----------
+        out: tuple of arrays, optional
+            C-contiguous buffers with shapes ``(n, 3, 3)``, ``(n, 3)``, and ``(n, 3, 3)`` for ``n >= len(self)``.
+            If given, operations are written to the first ``len(self)`` rows of the buffers and views of them are returned, so the buffers can be reused across calls.
+
+        Returns
+        -------
+        rotations: array[int], (len(self), 3, 3)
+        translations: array, (len(self), 3)
+        spin_rotations: array, (len(self), 3, 3)
+        """
+        num_nontrivial, num_spin_translations, num_centerings = self.shape
+        size = len(self)
+        if out is None:
+            rotations = np.empty((size, 3, 3), dtype=np.int_)
+            translations = np.empty((size, 3), dtype=np.float_)
+            spin_rotations = np.empty((size, 3, 3), dtype=np.float_)
+        else:
+            rotations, translations, spin_rotations = (
+                _get_output_view(buffer, size, tail)
+                for buffer, tail in zip(out, [(3, 3), (3,), (3, 3)])
+            )
+
+        np.copyto(
+            rotations.reshape(num_nontrivial, num_spin_translations * num_centerings, 3, 3),
+            self.rotations[:, None],
+        )
+
+        prim_translations = translations.reshape(
+            num_nontrivial, num_spin_translations, num_centerings, 3
+        )
+        np.add(
+            self.translations[:, None, None],
+            self.spin_translations[None, :, None],
+            out=prim_translations,
+        )
+        prim_translations += self.centerings[None, None, :]
+        invtmat = np.linalg.inv(self.transformation)
+        np.matmul(prim_translations, invtmat.T, out=prim_translations)
+        np.remainder(prim_translations, 1, out=prim_translations)
+
+        products = np.einsum(
+            "bij,ajk->abik", self.spin_translation_rotations, self.spin_rotations
+        )  # (num_nontrivial, num_spin_translations, 3, 3)
+        np.copyto(
+            spin_rotations.reshape(num_nontrivial, num_spin_translations, num_centerings, 3, 3),
+            products[:, :, None],
+        )
+
+        return rotations, translations, spin_rotations
+
+
+def _get_output_view(buffer: np.ndarray, size: int, tail: tuple[int, ...]) -> np.ndarray:
+    if buffer.shape[1:] != tail or len(buffer) < size:
+        raise ValueError(f"Output buffer with shape {buffer.shape} cannot hold {size} operations")
+    if not buffer.flags.c_contiguous:
+        raise ValueError("Output buffer should be C-contiguous")
+    return buffer[:size]
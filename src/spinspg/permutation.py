@@ -2,10 +2,23 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Callable, Iterator, Literal, overload
 
 import numpy as np
 
-from spinspg.utils import NDArrayFloat, NDArrayInt
+from spinspg.site_index import PeriodicSiteIndex
+from spinspg.utils import (
+    Deadline,
+    NDArrayBool,
+    NDArrayFloat,
+    NDArrayInt,
+    ndarray2d_to_integer_tuple,
+)
+
+# Default upper bound in bytes of temporary arrays used for matching sites
+DEFAULT_MAX_MEMORY = 1 << 27
+# Resolution of fractional translations to identify products of symmetry operations
+TRANSLATION_RESOLUTION = 10**4
 
 
 @dataclass
@@ -23,14 +36,134 @@ class Permutation:
 
         (self * rhs)(i) = self(rhs(i))
         """
-        n = len(self.permutation)
-        assert len(rhs.permutation) == n
-        mul = np.zeros(n, dtype=np.int_)
-        for i in range(n):
-            mul[i] = self(rhs(i))
-        return Permutation(mul)
+        assert len(rhs.permutation) == len(self.permutation)
+        return Permutation(np.asarray(self.permutation)[np.asarray(rhs.permutation)])
+
+
+@dataclass
+class PermutationGroup:
+    """Permutations of sites stored in a contiguous array.
+
+    The stored permutations do not need to be closed under compositions, e.g. permutations of coset representatives.
+
+    Attributes
+    ----------
+    permutations: array[int32], (order, num_sites)
+        ``permutations[p]`` maps the ``i``-th site to the ``permutations[p][i]``-th site
+    """
+
+    permutations: NDArrayInt
+
+    def __post_init__(self):
+        """Store permutations as a contiguous int32 array."""
+        self.permutations = np.ascontiguousarray(self.permutations, dtype=np.int32)
+        assert self.permutations.ndim == 2
+
+    @classmethod
+    def from_permutations(cls, permutations: list, num_sites: int) -> PermutationGroup:
+        """Instantiate from a list of permutations."""
+        if len(permutations) == 0:
+            return cls(np.zeros((0, num_sites), dtype=np.int32))
+        return cls(np.array([getattr(perm, "permutation", perm) for perm in permutations]))
+
+    @property
+    def order(self) -> int:
+        """Return number of stored permutations."""
+        return self.permutations.shape[0]
+
+    @property
+    def num_sites(self) -> int:
+        """Return number of permuted sites."""
+        return self.permutations.shape[1]
+
+    def __len__(self) -> int:
+        """Return number of stored permutations."""
+        return self.order
+
+    def __getitem__(self, idx):
+        """Return :class:`Permutation` for an integer index and :class:`PermutationGroup` otherwise."""
+        if isinstance(idx, (int, np.integer)):
+            return Permutation(self.permutations[idx])
+        return PermutationGroup(self.permutations[idx])
+
+    def __iter__(self) -> Iterator[Permutation]:
+        """Iterate over permutations."""
+        for perm in self.permutations:
+            yield Permutation(perm)
+
+    def compose(self, lhs, rhs) -> NDArrayInt:
+        """Return ``permutations[lhs][permutations[rhs]]`` for indices or broadcastable arrays of indices."""
+        lhs_perms = self.permutations[lhs]
+        rhs_perms = self.permutations[rhs]
+        lhs_perms, rhs_perms = np.broadcast_arrays(lhs_perms, rhs_perms)
+        return np.take_along_axis(lhs_perms, rhs_perms, axis=-1)
+
+    def inverse(self) -> PermutationGroup:
+        """Return inverses of all permutations."""
+        inverses = np.empty_like(self.permutations)
+        rows = np.arange(self.order)[:, None]
+        inverses[rows, self.permutations] = np.arange(self.num_sites, dtype=np.int32)[None, :]
+        return PermutationGroup(inverses)
+
+    def find(self, permutations: NDArrayInt) -> NDArrayInt:
+        """Return indices of given permutations, (..., num_sites), or -1 if not stored."""
+        return self._find(self._get_lookup(), permutations)
+
+    def get_composition_table(self) -> NDArrayInt:
+        """Return table whose ``(a, b)`` element is the index of ``permutations[a][permutations[b]]``, or -1 if not stored."""
+        lookup = self._get_lookup()
+        table = np.empty((self.order, self.order), dtype=np.int_)
+        for a in range(self.order):
+            table[a] = self._find(lookup, self.permutations[a][self.permutations])
+        return table
+
+    def _get_lookup(self) -> dict[bytes, int]:
+        """Return indices of stored permutations keyed by their bytes."""
+        return {perm.tobytes(): idx for idx, perm in enumerate(self.permutations)}
+
+    def _find(self, lookup: dict[bytes, int], permutations: NDArrayInt) -> NDArrayInt:
+        permutations = np.ascontiguousarray(permutations, dtype=np.int32)
+        flat = permutations.reshape(-1, self.num_sites)
+        indices = np.array([lookup.get(perm.tobytes(), -1) for perm in flat], dtype=np.int_)
+        return indices.reshape(permutations.shape[:-1])
+
+    def get_orbits(self) -> NDArrayInt:
+        """Return labels of orbits of sites under the group generated by the stored permutations.
+
+        Two sites have the same label iff they are in the same orbit.
+        Each label is the smallest site index in its orbit.
+        """
+        labels = np.arange(self.num_sites)
+        while True:
+            # Propagate minimum labels forward and backward along permutations
+            new_labels = np.min(labels[self.permutations], axis=0, initial=self.num_sites)
+            new_labels = np.minimum(labels, new_labels)
+            for perm in self.permutations:
+                np.minimum.at(new_labels, perm, new_labels)
+            if np.all(new_labels == labels):
+                return labels
+            labels = new_labels
 
+    def get_cycles(self, idx: int) -> list[NDArrayInt]:
+        """Return cycle decomposition of the ``idx``-th permutation, including fixed points."""
+        perm = self.permutations[idx]
+        visited = np.zeros(self.num_sites, dtype=bool)
+        cycles = []
+        for start in range(self.num_sites):
+            if visited[start]:
+                continue
+            cycle = [start]
+            visited[start] = True
+            site = perm[start]
+            while site != start:
+                cycle.append(site)
+                visited[site] = True
+                site = perm[site]
+            cycles.append(np.array(cycle, dtype=np.int_))
+        return cycles
 
+
+@overload
 def get_symmetry_permutations(
     lattice: NDArrayFloat,
     positions: NDArrayFloat,
@@ -38,31 +171,388 @@ def get_symmetry_permutations(
     rotations: NDArrayInt,
     translations: NDArrayFloat,
     symprec: float,
-) -> list[Permutation]:
-    """Return permutations of sites from given symmetry operations."""
-    num_sites = len(positions)
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    site_index: PeriodicSiteIndex | None = None,
+    initial_permutations: NDArrayInt | PermutationGroup | None = None,
+    deadline: Deadline | None = None,
+    return_indices: Literal[False] = ...,
+) -> PermutationGroup:
+    ...
+
+
+@overload
+def get_symmetry_permutations(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    rotations: NDArrayInt,
+    translations: NDArrayFloat,
+    symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    site_index: PeriodicSiteIndex | None = None,
+    initial_permutations: NDArrayInt | PermutationGroup | None = None,
+    deadline: Deadline | None = None,
+    *,
+    return_indices: Literal[True],
+) -> tuple[PermutationGroup, NDArrayInt]:
+    ...
+
+
+def get_symmetry_permutations(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    rotations: NDArrayInt,
+    translations: NDArrayFloat,
+    symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    site_index: PeriodicSiteIndex | None = None,
+    initial_permutations: NDArrayInt | PermutationGroup | None = None,
+    deadline: Deadline | None = None,
+    return_indices: bool = False,
+) -> PermutationGroup | tuple[PermutationGroup, NDArrayInt]:
+    """Return permutations of sites from given symmetry operations.
+
+    Sites are grouped by ``numbers`` and matched within each group by chunked broadcasting.
+    If ``site_index`` is given, each transformed site is instead looked up in the neighboring bins of the index.
+    If ``initial_permutations`` is given, they are first verified with O(num_sites) cost per operation and sites are matched only for operations failing the verification.
+    Operations which fail to map sites one-to-one are skipped.
+    Once ``deadline`` is set, sites are no longer matched and only operations matched so far or verified from ``initial_permutations`` are kept.
+
+    Parameters
+    ----------
+    lattice: array, (3, 3)
+    positions: array, (num_sites, 3)
+    numbers: array[int], (num_sites, )
+    rotations: array[int], (num_sym, 3, 3)
+    translations: array, (num_sym, 3)
+    symprec: float
+    max_memory: int, default=DEFAULT_MAX_MEMORY
+        Upper bound in bytes of temporary arrays for pairwise distances
+    site_index: PeriodicSiteIndex, optional
+        Index built from ``lattice``, ``positions``, ``numbers``, and ``symprec``.
+        It can be shared among calls for the same structure.
+    initial_permutations: array[int] or PermutationGroup, (num_sym, num_sites), optional
+        Candidate permutations for each operation, e.g., ones for a previous frame of relaxation or molecular dynamics
+    deadline: :class:`utils.Deadline`, optional
+        Checked before matching sites for each operation
+    return_indices: bool, default=False
+        If true, also return indices of operations with permutations
+
+    Returns
+    -------
+    permutations: PermutationGroup
+    indices: array[int], (order, )
+        Only returned if ``return_indices`` is true.
+        ``permutations[j]`` is a permutation for the ``indices[j]``-th operation.
+    """
+    lattice = np.asarray(lattice, dtype=np.float_)
+    positions = np.asarray(positions, dtype=np.float_)
+    buckets = get_species_buckets(numbers)
+
+    if initial_permutations is not None:
+        if isinstance(initial_permutations, PermutationGroup):
+            initial_permutations = initial_permutations.permutations
+        initial_permutations = np.asarray(initial_permutations)
+        assert initial_permutations.shape == (len(rotations), len(positions))
+        verified = verify_permutations(
+            lattice,
+            positions,
+            numbers,
+            rotations,
+            translations,
+            initial_permutations,
+            symprec,
+            max_memory,
+        )
+    else:
+        verified = np.zeros(len(rotations), dtype=np.bool_)
 
     permutations = []
-    for rot, trans in zip(rotations, translations):
-        new_positions = positions @ rot.T + trans[None, :]
-        perm = [-1 for _ in range(num_sites)]
-        found = [False for _ in range(num_sites)]
-        for i in range(num_sites):
-            for j in range(num_sites):
-                if found[j] or (numbers[i] != numbers[j]):
-                    continue
-                if is_overlap_with_origin(lattice, new_positions[i] - positions[j], symprec):
-                    perm[i] = j
-                    found[j] = True
-                    break
+    indices = []
+    for idx, (rot, trans) in enumerate(zip(rotations, translations)):
+        if verified[idx]:
+            permutations.append(initial_permutations[idx])  # type: ignore
+            indices.append(idx)
+            continue
+        if deadline is not None and deadline.is_set():
+            continue
+        new_positions = positions @ np.transpose(rot) + np.asarray(trans)[None, :]
+        if site_index is not None:
+            perm = site_index.match(new_positions, max_memory)
+        else:
+            perm = match_sites(lattice, positions, new_positions, buckets, symprec, max_memory)
+        if perm is not None:
+            permutations.append(perm)
+            indices.append(idx)
 
-        if np.all(perm != -1):
-            permutations.append(Permutation(perm))
+    group = PermutationGroup.from_permutations(permutations, len(positions))
+    if return_indices:
+        return group, np.array(indices, dtype=np.int_)
+    return group
 
-    return permutations
+
+def verify_permutations(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    rotations: NDArrayInt,
+    translations: NDArrayFloat,
+    permutations: NDArrayInt,
+    symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> NDArrayBool:
+    """Return if each of ``permutations`` is a permutation of sites by the corresponding operation.
+
+    The ``k``-th operation should move the ``i``-th site onto the ``permutations[k, i]``-th site with the same species within ``symprec``.
+
+    Returns
+    -------
+    verified: array[bool], (num_sym, )
+    """
+    lattice = np.asarray(lattice, dtype=np.float_)
+    positions = np.asarray(positions, dtype=np.float_)
+    numbers = np.asarray(numbers)
+    rotations = np.asarray(rotations)
+    translations = np.asarray(translations, dtype=np.float_)
+    permutations = np.asarray(permutations)
+    num_sym, num_sites = permutations.shape
+
+    in_range = np.all((permutations >= 0) & (permutations < num_sites), axis=1)
+    clipped = np.clip(permutations, 0, num_sites - 1)
+    verified = (
+        in_range
+        & np.all(np.sort(clipped, axis=1) == np.arange(num_sites)[None, :], axis=1)
+        & np.all(numbers[clipped] == numbers[None, :], axis=1)
+    )
+
+    # Distances between transformed sites and their images
+    chunk = max(1, max_memory // (72 * max(num_sites, 1)))
+    for start in range(0, num_sym, chunk):
+        end = min(start + chunk, num_sym)
+        new_positions = (
+            np.einsum("kij,nj->kni", rotations[start:end], positions)
+            + translations[start:end, None, :]
+        )
+        diff = new_positions - positions[clipped[start:end]]
+        diff -= np.rint(diff)
+        dist2 = np.sum((diff @ lattice) ** 2, axis=2)
+        verified[start:end] &= np.all(dist2 < symprec**2, axis=1)
+
+    return verified
+
+
+def get_species_buckets(numbers: NDArrayInt) -> list[NDArrayInt]:
+    """Return indices of sites grouped by species."""
+    numbers = np.asarray(numbers)
+    return [np.nonzero(numbers == number)[0] for number in np.unique(numbers)]
+
+
+def match_sites(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    new_positions: NDArrayFloat,
+    buckets: list[NDArrayInt],
+    symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> NDArrayInt | None:
+    """Return ``perm`` such that ``new_positions[i]`` overlaps with ``positions[perm[i]]``.
+
+    Return None if ``new_positions`` are not mapped one-to-one onto ``positions``.
+    """
+    num_sites = len(positions)
+    perm = np.full(num_sites, -1, dtype=np.int_)
+    for bucket in buckets:
+        size = len(bucket)
+        dst = positions[bucket]
+        # Pairwise differences, their Cartesian coordinates, and squared distances
+        chunk = max(1, max_memory // (56 * size))
+        for start in range(0, size, chunk):
+            src = new_positions[bucket[start : start + chunk]]
+            diff = src[:, None, :] - dst[None, :, :]
+            diff -= np.rint(diff)
+            dist2 = np.sum((diff @ lattice) ** 2, axis=2)
+            nearest = np.argmin(dist2, axis=1)
+            if np.any(dist2[np.arange(len(src)), nearest] >= symprec**2):
+                return None
+            perm[bucket[start : start + chunk]] = bucket[nearest]
+
+    if len(np.unique(perm)) != num_sites:
+        return None
+    return perm
 
 
 def is_overlap_with_origin(lattice, frac_coords, symprec) -> bool:
     """Return true iff ``frac_coords`` is overlapped with the origin up to lattice translations."""
     diff = lattice.T @ (frac_coords - np.rint(frac_coords))
     return np.linalg.norm(diff) < symprec
+
+
+def get_symmetry_permutations_from_generators(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    rotations: NDArrayInt,
+    translations: NDArrayFloat,
+    centerings: NDArrayFloat,
+    symprec: float,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    site_index: PeriodicSiteIndex | None = None,
+) -> tuple[PermutationGroup, PermutationGroup]:
+    """Return permutations of sites by composing those of generators.
+
+    A space group is decomposed as ``{(I, centerings[j])} * {(rotations[i], translations[i])}``, where rotation parts of ``rotations`` are distinct, such as symmetry operations from spglib.
+    Sites are matched geometrically only for generating sets of the centering translations and of the coset representatives, which are chosen greedily in the given order.
+    Permutations of the other operations are obtained by compositions, where each product is identified by its integer rotation and its translation modulo lattice translations.
+
+    Parameters
+    ----------
+    lattice: array, (3, 3)
+    positions: array, (num_sites, 3)
+    numbers: array[int], (num_sites, )
+    rotations: array[int], (num_rotations, 3, 3)
+    translations: array, (num_rotations, 3)
+    centerings: array, (num_centerings, 3)
+    symprec: float
+    max_memory: int, default=DEFAULT_MAX_MEMORY
+    site_index: PeriodicSiteIndex, optional
+
+    Returns
+    -------
+    permutations: PermutationGroup
+        Permutations for ``(rotations[i], translations[i])``
+    centering_permutations: PermutationGroup
+        Permutations for ``centerings[j]``
+    """
+    lattice = np.asarray(lattice, dtype=np.float_)
+    positions = np.asarray(positions, dtype=np.float_)
+    rotations = np.asarray(rotations)
+    translations = np.asarray(translations, dtype=np.float_)
+    centerings = np.asarray(centerings, dtype=np.float_)
+    buckets = get_species_buckets(numbers)
+
+    def match(rot: NDArrayInt, trans: NDArrayFloat) -> NDArrayInt | None:
+        new_positions = positions @ rot.T + trans[None, :]
+        if site_index is not None:
+            return site_index.match(new_positions, max_memory)
+        return match_sites(lattice, positions, new_positions, buckets, symprec, max_memory)
+
+    # Centerings keyed by translations modulo lattice translations
+    centering_table = _TranslationTable(lattice, centerings, symprec)
+
+    def multiply_centerings(lhs: int, rhs: int, perms: list) -> tuple[int, NDArrayInt | None]:
+        product = centering_table.find(centerings[lhs] + centerings[rhs])
+        return product, perms[lhs][perms[rhs]]
+
+    identity = np.eye(3, dtype=np.int_)
+    centering_perms = _generate_permutations(
+        len(centerings),
+        lambda idx: match(identity, centerings[idx]),
+        multiply_centerings,
+    )
+    inverse_centering_perms = [
+        None if perm is None else np.argsort(perm) for perm in centering_perms
+    ]
+
+    # Coset representatives keyed by integer rotations. A product of representatives coincides
+    # with a representative up to a centering, (R1, t1) (R2, t2) = (I, c) (R1 R2, t12).
+    representatives = {ndarray2d_to_integer_tuple(rot): idx for idx, rot in enumerate(rotations)}
+
+    def multiply_representatives(lhs: int, rhs: int, perms: list) -> tuple[int, NDArrayInt | None]:
+        product = representatives.get(
+            ndarray2d_to_integer_tuple(rotations[lhs] @ rotations[rhs]), -1
+        )
+        if product == -1:
+            return -1, None
+        centering = centering_table.find(
+            rotations[lhs] @ translations[rhs] + translations[lhs] - translations[product]
+        )
+        if centering == -1:
+            return -1, None
+        inverse_centering_perm = inverse_centering_perms[centering]
+        if inverse_centering_perm is None:
+            return -1, None
+        return product, inverse_centering_perm[perms[lhs][perms[rhs]]]
+
+    perms = _generate_permutations(
+        len(rotations),
+        lambda idx: match(rotations[idx], translations[idx]),
+        multiply_representatives,
+    )
+
+    num_sites = len(positions)
+    return (
+        PermutationGroup.from_permutations([p for p in perms if p is not None], num_sites),
+        PermutationGroup.from_permutations(
+            [p for p in centering_perms if p is not None], num_sites
+        ),
+    )
+
+
+class _TranslationTable:
+    """Look up translations modulo lattice translations."""
+
+    def __init__(self, lattice: NDArrayFloat, translations: NDArrayFloat, symprec: float):
+        self.lattice = lattice
+        self.translations = translations
+        self.symprec = symprec
+        self.indices: dict[tuple, int] = {}
+        for idx, trans in enumerate(translations):
+            self.indices.setdefault(self._get_key(trans), idx)
+
+    @staticmethod
+    def _get_key(trans: NDArrayFloat) -> tuple:
+        reduced = np.rint(np.remainder(trans, 1) * TRANSLATION_RESOLUTION).astype(np.int_)
+        return tuple(reduced % TRANSLATION_RESOLUTION)
+
+    def find(self, trans: NDArrayFloat) -> int:
+        """Return index of ``trans`` up to lattice translations, or -1 if not found."""
+        idx = self.indices.get(self._get_key(trans), -1)
+        if idx != -1:
+            return idx
+        # Translations rounded across boundaries of the grid
+        diff = trans[None, :] - self.translations
+        diff -= np.rint(diff)
+        found = np.nonzero(np.linalg.norm(diff @ self.lattice, axis=1) < self.symprec)[0]
+        if len(found) == 0:
+            return -1
+        return found[0]
+
+
+def _generate_permutations(
+    num_elements: int,
+    match: Callable[[int], NDArrayInt | None],
+    multiply: Callable[[int, int, list], tuple[int, NDArrayInt | None]],
+) -> list[NDArrayInt | None]:
+    """Return permutations of group elements from those of greedily chosen generators.
+
+    ``match(idx)`` geometrically computes the permutation of the ``idx``-th element.
+    ``multiply(lhs, rhs, perms)`` returns the index of the product of the ``lhs``-th and ``rhs``-th elements and its permutation.
+    """
+    perms: list[NDArrayInt | None] = [None for _ in range(num_elements)]
+    known: list[int] = []
+    generators: list[int] = []
+    for idx in range(num_elements):
+        if perms[idx] is not None:
+            continue
+        perm = match(idx)
+        if perm is None:
+            continue
+        perms[idx] = perm
+        generators.append(idx)
+
+        # Close by left multiplications. Elements of the subgroup generated so far are already
+        # closed under the previous generators, so only the new generator is applied to them.
+        queue = [(rhs, [idx]) for rhs in known] + [(idx, generators)]
+        known.append(idx)
+        while queue:
+            rhs, lhs_list = queue.pop()
+            for lhs in lhs_list:
+                product, product_perm = multiply(lhs, rhs, perms)
+                if product == -1 or perms[product] is not None:
+                    continue
+                perms[product] = product_perm
+                known.append(product)
+                queue.append((product, generators))
+
+    return perms
@@ -0,0 +1,118 @@
+"""Periodic cell list of sites for matching positions up to lattice translations."""
+from __future__ import annotations
+
+from itertools import product
+
+import numpy as np
+
+from spinspg.utils import NDArrayFloat, NDArrayInt
+
+
+class PeriodicSiteIndex:
+    """Hash grid over fractional coordinates of sites in a periodic cell.
+
+    The unit cell is divided into ``bins[0] * bins[1] * bins[2]`` bins whose widths are no less than ``symprec`` in Cartesian coordinates.
+    Thus, sites within ``symprec`` from a query point are found in the bin of the point and its neighboring bins, wrapped around cell boundaries.
+
+    Parameters
+    ----------
+    lattice: array, (3, 3)
+        ``lattice[i, :]`` is the ``i``-th basis vector
+    positions: array, (num_sites, 3)
+        Fractional coordinates of sites
+    numbers: array[int], (num_sites, )
+        Species of sites
+    symprec: float
+        Distance tolerance in Cartesian coordinates
+
+    Attributes
+    ----------
+    bins: array[int], (3, )
+        Number of bins along each basis vector
+    """
+
+    def __init__(
+        self,
+        lattice: NDArrayFloat,
+        positions: NDArrayFloat,
+        numbers: NDArrayInt,
+        symprec: float,
+    ):
+        self.lattice = np.asarray(lattice, dtype=np.float_)
+        self.positions = np.asarray(positions, dtype=np.float_)
+        self.numbers = np.asarray(numbers)
+        self.symprec = symprec
+        num_sites = len(self.positions)
+
+        # Distance between lattice planes spanned by the other two basis vectors
+        heights = 1 / np.linalg.norm(np.linalg.inv(self.lattice), axis=0)
+        # Aim at about one site per bin while keeping bin widths no less than symprec
+        density = (num_sites / np.abs(np.linalg.det(self.lattice))) ** (1 / 3)
+        bins = np.minimum(np.floor(heights / symprec), np.ceil(heights * density))
+        self.bins = np.maximum(bins, 1).astype(np.int_)
+
+        keys = self._get_keys(self._get_bin_coords(self.positions))
+        self._order = np.argsort(keys, kind="stable")
+        counts = np.bincount(keys, minlength=np.prod(self.bins))
+        self._counts = counts
+        self._starts = np.cumsum(counts) - counts
+
+        # Offsets to neighboring bins without duplicates for fewer than three bins
+        offsets_1d = [[0] if n == 1 else ([0, 1] if n == 2 else [-1, 0, 1]) for n in self.bins]
+        self._offsets = np.array(list(product(*offsets_1d)), dtype=np.int_)
+
+    def _get_bin_coords(self, positions: NDArrayFloat) -> NDArrayInt:
+        wrapped = positions - np.floor(positions)
+        coords = np.floor(wrapped * self.bins[None, :]).astype(np.int_)
+        # Guard against positions rounded to exactly one
+        return np.minimum(coords, self.bins[None, :] - 1)
+
+    def _get_keys(self, bin_coords: NDArrayInt) -> NDArrayInt:
+        return (bin_coords[..., 0] * self.bins[1] + bin_coords[..., 1]) * self.bins[
+            2
+        ] + bin_coords[..., 2]
+
+    def match(
+        self,
+        new_positions: NDArrayFloat,
+        max_memory: int,
+    ) -> NDArrayInt | None:
+        """Return ``perm`` such that ``new_positions[i]`` overlaps with ``positions[perm[i]]`` of the same species.
+
+        Return None if ``new_positions`` are not mapped one-to-one onto indexed sites.
+        """
+        num_sites = len(self.positions)
+        num_offsets = len(self._offsets)
+        bin_coords = self._get_bin_coords(new_positions)  # (num_sites, 3)
+        neighbors = np.remainder(
+            bin_coords[:, None, :] + self._offsets[None, :, :], self.bins[None, None, :]
+        )
+        neighbor_keys = self._get_keys(neighbors)  # (num_sites, num_offsets)
+        max_count = max(int(np.max(self._counts[neighbor_keys])), 1)
+
+        perm = np.full(num_sites, -1, dtype=np.int_)
+        chunk = max(1, max_memory // (64 * num_offsets * max_count))
+        for start in range(0, num_sites, chunk):
+            keys = neighbor_keys[start : start + chunk]
+            # Indices of candidate sites, (chunk, num_offsets, max_count)
+            slots = np.arange(max_count)[None, None, :]
+            valid = slots < self._counts[keys][:, :, None]
+            candidates = self._order[
+                np.minimum(self._starts[keys][:, :, None] + slots, num_sites - 1)
+            ].reshape(len(keys), -1)
+            valid = valid.reshape(len(keys), -1)
+            valid &= self.numbers[candidates] == self.numbers[start : start + chunk, None]
+
+            diff = new_positions[start : start + chunk, None, :] - self.positions[candidates]
+            diff -= np.rint(diff)
+            dist2 = np.sum((diff @ self.lattice) ** 2, axis=2)
+            dist2[~valid] = np.inf
+            nearest = np.argmin(dist2, axis=1)
+            rows = np.arange(len(keys))
+            if np.any(dist2[rows, nearest] >= self.symprec**2):
+                return None
+            perm[start : start + chunk] = candidates[rows, nearest]
+
+        if len(np.unique(perm)) != num_sites:
+            return None
+        return perm
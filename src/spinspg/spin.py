@@ -7,7 +7,7 @@ from enum import Enum, auto
 import numpy as np
 from spgrep.spinor import get_rotation_angle_and_axis
 
-from spinspg.utils import NDArrayFloat
+from spinspg.utils import NDArrayBool, NDArrayFloat, NDArrayInt
 
 
 class SpinOnlyGroupType(Enum):
@@ -85,6 +85,40 @@ class SpinOnlyGroup:
         else:
             return False
 
+    def contain_many(self, linears: NDArrayFloat, atol: float = 1e-5) -> NDArrayBool:
+        """Return if this spin only group contains each of ``linears``, (K, 3, 3).
+
+        This is a vectorized version of :meth:`contain` with closed-form angles and axes of rotations.
+        """
+        linears = np.asarray(linears, dtype=np.float_).reshape(-1, 3, 3)
+        num = len(linears)
+        if self.spin_only_group_type == SpinOnlyGroupType.NONMAGNETIC:
+            return np.ones(num, dtype=bool)
+        # Group contains identity
+        is_identity = np.all(np.isclose(linears, np.eye(3)[None, :, :], atol=atol), axis=(1, 2))
+        if self.spin_only_group_type == SpinOnlyGroupType.NONCOPLANAR:
+            return is_identity
+
+        signs = np.where(np.linalg.det(linears) > 0, 1, -1)
+        rotations = signs[:, None, None] * linears
+        thetas, axes = get_rotation_angles_and_axes(rotations)
+
+        # Collinear and coplanar spin only groups have axes
+        axis = self.axis
+        assert axis is not None
+        is_parallel = np.all(np.isclose(np.cross(axes, axis), 0, atol=atol), axis=1)
+        two_fold = np.isclose(thetas, np.pi, atol=atol)
+        if self.spin_only_group_type == SpinOnlyGroupType.COPLANAR:
+            # Mirror along self.axis
+            contained = (signs == -1) & is_parallel & two_fold
+        else:
+            # Rotation along self.axis or mirror containing self.axis
+            is_perpendicular = np.isclose(axes @ axis, 0, atol=atol)
+            contained = ((signs == 1) & is_parallel) | (
+                (signs == -1) & is_perpendicular & two_fold
+            )
+        return is_identity | contained
+
     @classmethod
     def nonmagnetic(cls) -> SpinOnlyGroup:
         """Instantiate nonmagnetic spin-only group."""
@@ -106,6 +140,60 @@ class SpinOnlyGroup:
         return SpinOnlyGroup(SpinOnlyGroupType.NONCOPLANAR, None)
 
 
+def get_rotation_angles_and_axes(
+    rotations: NDArrayFloat,
+) -> tuple[NDArrayFloat, NDArrayFloat]:
+    """Return angles and axes of stacked proper rotations, (K, 3, 3).
+
+    This follows the conventions of :func:`spgrep.spinor.get_rotation_angle_and_axis`: angles are chosen between 0 and pi, and identity has angle 0 and axis (0, 0, 1).
+
+    Returns
+    -------
+    thetas: array, (K, )
+    axes: array, (K, 3)
+    """
+    rotations = np.asarray(rotations, dtype=np.float_).reshape(-1, 3, 3)
+    num = len(rotations)
+    thetas = np.zeros(num, dtype=np.float_)
+    axes = np.zeros((num, 3), dtype=np.float_)
+    axes[:, 2] = 1
+
+    is_identity = np.all(np.isclose(rotations, np.eye(3)[None, :, :]), axis=(1, 2))
+    cos_thetas = (np.trace(rotations, axis1=1, axis2=2) - 1) / 2
+    is_two_fold = ~is_identity & np.isclose(cos_thetas, -1)
+    is_general = ~is_identity & ~is_two_fold
+
+    # Two-fold rotation, R = 2 * a a^T - I
+    if np.any(is_two_fold):
+        outer = (rotations[is_two_fold] + np.eye(3)[None, :, :]) / 2  # a a^T
+        cols = np.argmax(np.diagonal(outer, axis1=1, axis2=2), axis=1)
+        two_fold_axes = outer[np.arange(len(outer)), :, cols]
+        two_fold_axes /= np.linalg.norm(two_fold_axes, axis=1)[:, None]
+        # Fix direction by lexicographic order
+        nonzero = ~np.isclose(two_fold_axes, 0)
+        first = np.argmax(nonzero, axis=1)
+        leading = two_fold_axes[np.arange(len(outer)), first]
+        two_fold_axes[leading < 0] *= -1
+        thetas[is_two_fold] = np.pi
+        axes[is_two_fold] = two_fold_axes
+
+    if np.any(is_general):
+        general = rotations[is_general]
+        nondiag = np.stack(
+            [
+                general[:, 1, 2] - general[:, 2, 1],
+                general[:, 2, 0] - general[:, 0, 2],
+                general[:, 0, 1] - general[:, 1, 0],
+            ],
+            axis=1,
+        )
+        sin_thetas = np.linalg.norm(nondiag, axis=1) / 2
+        thetas[is_general] = np.arctan2(sin_thetas, cos_thetas[is_general])
+        axes[is_general] = nondiag / (-2 * sin_thetas[:, None])
+
+    return thetas, axes
+
+
 def get_spin_only_group(magmoms: NDArrayFloat, mag_symprec: float) -> SpinOnlyGroup:
     """Determine spin only group of given spin arrangement.
 
@@ -118,9 +206,32 @@ def get_spin_only_group(magmoms: NDArrayFloat, mag_symprec: float) -> SpinOnlyGr
     -------
     spin_only_group: SpinOnlyGroup
     """
+    residuals, parallel_axis, vertical_axis = get_spin_only_group_residuals(magmoms)
+    return get_spin_only_group_from_residuals(residuals, parallel_axis, vertical_axis, mag_symprec)
+
+
+def get_spin_only_group_residuals(
+    magmoms: NDArrayFloat,
+) -> tuple[NDArrayFloat, NDArrayFloat, NDArrayFloat]:
+    """Return residuals of given spin arrangement for being nonmagnetic, collinear, and coplanar.
+
+    Parameters
+    ----------
+    magmoms : array, (num_sites, 3)
+        Magnetic moments in Cartesian coordinates
+
+    Returns
+    -------
+    residuals: array, (3, )
+        The spin arrangement is nonmagnetic, collinear, or coplanar with tolerance ``mag_symprec`` if ``residuals[0]``, ``residuals[1]``, or ``residuals[2]`` is less than ``mag_symprec``, respectively.
+    parallel_axis: array, (3, )
+        Axis for collinear spin only group
+    vertical_axis: array, (3, )
+        Axis for coplanar spin only group
+    """
+    magmoms = np.asarray(magmoms, dtype=np.float_)
     # Nonmagnetic
-    if np.max(np.linalg.norm(magmoms, axis=1)) < mag_symprec:
-        return SpinOnlyGroup.nonmagnetic()
+    residual_nonmagnetic = np.max(np.linalg.norm(magmoms, axis=1))
 
     moment = np.einsum("ij,ik->jk", magmoms, magmoms, optimize="greedy")  # (3, 3), symmetric
     _, eigvecs = np.linalg.eigh(moment)  # eigenvalues in ascending order
@@ -130,19 +241,89 @@ def get_spin_only_group(magmoms: NDArrayFloat, mag_symprec: float) -> SpinOnlyGr
     residual_collinear = (
         magmoms - (magmoms @ parallel_axis)[:, None] * parallel_axis[None, :]
     )  # (N, 3)
-    if np.max(2 * np.linalg.norm(residual_collinear, axis=1)) < mag_symprec:
-        return SpinOnlyGroup.collinear(parallel_axis)
 
     # Coplanar
     vertical_axis = eigvecs[:, 0] / np.linalg.norm(eigvecs[:, 0])
     residual_coplanar = (magmoms @ vertical_axis)[:, None] * vertical_axis[None, :]  # (N, 3)
-    if np.max(2 * np.linalg.norm(residual_coplanar, axis=1)) < mag_symprec:
-        return SpinOnlyGroup.coplanar(vertical_axis)
 
-    # Non-coplanar
+    residuals = np.array(
+        [
+            residual_nonmagnetic,
+            np.max(2 * np.linalg.norm(residual_collinear, axis=1)),
+            np.max(2 * np.linalg.norm(residual_coplanar, axis=1)),
+        ]
+    )
+    return residuals, parallel_axis, vertical_axis
+
+
+def get_spin_only_group_from_residuals(
+    residuals: NDArrayFloat,
+    parallel_axis: NDArrayFloat,
+    vertical_axis: NDArrayFloat,
+    mag_symprec: float,
+) -> SpinOnlyGroup:
+    """Determine spin only group from :func:`get_spin_only_group_residuals` with tolerance ``mag_symprec``."""
+    if residuals[0] < mag_symprec:
+        return SpinOnlyGroup.nonmagnetic()
+    if residuals[1] < mag_symprec:
+        return SpinOnlyGroup.collinear(parallel_axis)
+    if residuals[2] < mag_symprec:
+        return SpinOnlyGroup.coplanar(vertical_axis)
     return SpinOnlyGroup.noncoplanar()
 
 
+def get_spin_only_group_types(
+    magmoms_stack: NDArrayFloat, mag_symprec: float
+) -> tuple[NDArrayInt, NDArrayFloat]:
+    """Determine spin only groups of stacked spin arrangements at once.
+
+    This is a vectorized version of :func:`get_spin_only_group` over the first axis.
+
+    Parameters
+    ----------
+    magmoms_stack : array, (num_frames, num_sites, 3)
+        Magnetic moments in Cartesian coordinates
+
+    Returns
+    -------
+    types: array[int], (num_frames, )
+        Values of :class:`SpinOnlyGroupType`
+    axes: array, (num_frames, 3)
+        Parallel axes for collinear, perpendicular axes for coplanar, and NaN for the other spin only groups
+    """
+    magmoms_stack = np.asarray(magmoms_stack, dtype=np.float_)
+    num_frames = len(magmoms_stack)
+    nonmagnetic = np.max(np.linalg.norm(magmoms_stack, axis=2), axis=1, initial=0) < mag_symprec
+
+    moments = np.einsum("fni,fnj->fij", magmoms_stack, magmoms_stack, optimize="greedy")
+    _, eigvecs = np.linalg.eigh(moments)  # eigenvalues in ascending order
+
+    # Collinear
+    parallel_axes = eigvecs[:, :, -1] / np.linalg.norm(eigvecs[:, :, -1], axis=1)[:, None]
+    projections = np.einsum("fni,fi->fn", magmoms_stack, parallel_axes)
+    residuals_collinear = magmoms_stack - projections[:, :, None] * parallel_axes[:, None, :]
+    collinear = (
+        np.max(2 * np.linalg.norm(residuals_collinear, axis=2), axis=1, initial=0) < mag_symprec
+    )
+
+    # Coplanar
+    vertical_axes = eigvecs[:, :, 0] / np.linalg.norm(eigvecs[:, :, 0], axis=1)[:, None]
+    residuals_coplanar = np.abs(np.einsum("fni,fi->fn", magmoms_stack, vertical_axes))
+    coplanar = np.max(2 * residuals_coplanar, axis=1, initial=0) < mag_symprec
+
+    types = np.full(num_frames, SpinOnlyGroupType.NONCOPLANAR.value, dtype=np.int_)
+    types[coplanar] = SpinOnlyGroupType.COPLANAR.value
+    types[collinear] = SpinOnlyGroupType.COLLINEAR.value
+    types[nonmagnetic] = SpinOnlyGroupType.NONMAGNETIC.value
+
+    axes = np.full((num_frames, 3), np.nan)
+    is_coplanar = types == SpinOnlyGroupType.COPLANAR.value
+    is_collinear = types == SpinOnlyGroupType.COLLINEAR.value
+    axes[is_coplanar] = vertical_axes[is_coplanar]
+    axes[is_collinear] = parallel_axes[is_collinear]
+    return types, axes
+
+
 def solve_procrustes(A: NDArrayFloat, B: NDArrayFloat) -> NDArrayFloat:
     """Solve orthogonal Procrustes problem.
 
@@ -161,3 +342,33 @@ def solve_procrustes(A: NDArrayFloat, B: NDArrayFloat) -> NDArrayFloat:
     u, s, vt = np.linalg.svd(B.T @ A)
     R = u @ vt
     return R
+
+
+def solve_procrustes_batch(A: NDArrayFloat, B: NDArrayFloat) -> tuple[NDArrayFloat, NDArrayFloat]:
+    """Solve stacked orthogonal Procrustes problems with one stacked SVD.
+
+        argmin_{ R[k] in O(3) } || R[k] A[k]^T - B[k]^T ||_{F}
+
+    Parameters
+    ----------
+    A: array, (..., n, 3)
+    B: array, (..., n, 3)
+        Broadcastable with ``A``
+
+    Returns
+    -------
+    R: array, (..., 3, 3)
+        orthogonal matrices
+    residuals: array, (..., )
+        ``max_i || R[k] @ A[k, i] - B[k, i] ||``
+    """
+    cov = np.einsum("...ni,...nj->...ij", B, A, optimize="greedy")  # B.T @ A
+    u, _, vt = np.linalg.svd(cov)
+    R = u @ vt
+    return R, get_procrustes_residuals(A, B, R)
+
+
+def get_procrustes_residuals(A: NDArrayFloat, B: NDArrayFloat, R: NDArrayFloat) -> NDArrayFloat:
+    """Return ``max_i || R[k] @ A[k, i] - B[k, i] ||`` for stacked ``A``, ``B``, and ``R``."""
+    diff = A @ np.swapaxes(R, -1, -2) - B
+    return np.max(np.linalg.norm(diff, axis=-1), axis=-1, initial=0)
@@ -0,0 +1,76 @@
+"""Spin symmetry for many tolerances from residuals computed once."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from spinspg.group import NonmagneticSymmetry, SpinSpaceGroup, SpinSymmetryResiduals
+from spinspg.permutation import DEFAULT_MAX_MEMORY
+from spinspg.utils import NDArrayFloat, NDArrayInt
+
+
+@dataclass
+class ToleranceSweep:
+    """Spin space groups of one spin arrangement for many tolerances.
+
+    Attributes
+    ----------
+    mag_symprecs: array, (num_tolerances, )
+        Sorted tolerances for magnetic moments
+    spin_space_groups: list[:class:`group.SpinSpaceGroup`]
+        Spin space group for each of ``mag_symprecs``
+    num_operations: array[int], (num_tolerances, )
+        Number of spin symmetry operations in input cell for each of ``mag_symprecs``
+    critical_tolerances: array, (num_critical, )
+        Sorted tolerances ``t`` such that spin space groups for tolerances slightly above and at most ``t`` differ in types of spin only groups or numbers of operations
+    """
+
+    mag_symprecs: NDArrayFloat
+    spin_space_groups: list[SpinSpaceGroup]
+    num_operations: NDArrayInt
+    critical_tolerances: NDArrayFloat
+
+
+def get_spin_symmetry_sweep(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms: NDArrayFloat,
+    mag_symprecs: NDArrayFloat,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+) -> ToleranceSweep:
+    """Return spin space groups of ``magmoms`` for each of ``mag_symprecs`` in one pass.
+
+    Residuals of all candidates of spin symmetry operations are computed once by :class:`group.SpinSymmetryResiduals`.
+    Spin space groups are assembled only for ``mag_symprecs``, and critical tolerances are found by counting operations from the residuals.
+
+    Parameters
+    ----------
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`
+    magmoms: array, (num_sites, 3)
+    mag_symprecs: array, (num_tolerances, )
+        Positive tolerances for magnetic moments
+    max_memory: int, default=DEFAULT_MAX_MEMORY
+        Upper bound in bytes of temporary arrays for Procrustes problems
+
+    Returns
+    -------
+    sweep: :class:`ToleranceSweep`
+    """
+    mag_symprecs = np.sort(np.asarray(mag_symprecs, dtype=np.float_).reshape(-1))
+    assert np.all(mag_symprecs > 0)
+    residuals = SpinSymmetryResiduals(nonmagnetic_symmetry, magmoms, max_memory)
+
+    spin_space_groups = [residuals.get_spin_space_group(t) for t in mag_symprecs]
+    num_operations = np.array(
+        [
+            len(ssg.nontrivial_coset) * len(ssg.spin_translation_coset) * len(ssg.prim_centerings)
+            for ssg in spin_space_groups
+        ],
+        dtype=np.int_,
+    )
+    return ToleranceSweep(
+        mag_symprecs=mag_symprecs,
+        spin_space_groups=spin_space_groups,
+        num_operations=num_operations,
+        critical_tolerances=residuals.get_critical_tolerances(),
+    )
@@ -0,0 +1,231 @@
+"""Spin symmetry along trajectories of spin arrangements on a fixed crystal structure."""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from spinspg.group import (
+    NonmagneticSymmetry,
+    SpinSpaceGroup,
+    get_operations_in_cell,
+    get_primitive_spin_symmetry,
+    get_symmetry_with_cell,
+)
+from spinspg.spin import SpinOnlyGroupType, get_spin_only_group_types, solve_procrustes_batch
+from spinspg.utils import NDArrayBool, NDArrayFloat, NDArrayInt
+
+
+@dataclass
+class SpinSymmetryTrajectory:
+    """Spin symmetry of each frame of a trajectory.
+
+    Frames with the same label have the same type of spin only group and the same spatial operations admitting spin rotations.
+    Labels are numbered in order of first appearance.
+
+    Attributes
+    ----------
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`
+        Symmetry of the crystal structure without magnetic moments
+    labels: array[int], (num_frames, )
+        Label of spin symmetry of each frame
+    change_points: array[int], (num_changes, )
+        Frames whose labels differ from their previous frames
+    spin_only_group_types: array[int], (num_labels, )
+        Values of :class:`spin.SpinOnlyGroupType` for each label
+    valid: array[bool], (num_labels, num_operations)
+        ``valid[l, k]`` is true iff the ``k``-th spatial operation in input cell admits a spin rotation in frames with the ``l``-th label.
+        Operations are ordered as products of ``nonmagnetic_symmetry.prim_permutations`` and ``nonmagnetic_symmetry.prim_centering_permutations``.
+    representative_frames: array[int], (num_labels, )
+        First frame with each label
+    spin_space_groups: list[:class:`group.SpinSpaceGroup`]
+        Spin space group of the representative frame of each label
+    """
+
+    nonmagnetic_symmetry: NonmagneticSymmetry
+    labels: NDArrayInt
+    change_points: NDArrayInt
+    spin_only_group_types: NDArrayInt
+    valid: NDArrayBool
+    representative_frames: NDArrayInt
+    spin_space_groups: list[SpinSpaceGroup]
+
+    def __len__(self) -> int:
+        """Return number of frames."""
+        return len(self.labels)
+
+    @property
+    def num_labels(self) -> int:
+        """Return number of distinct labels."""
+        return len(self.representative_frames)
+
+
+def get_spin_symmetry_trajectory(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    magmoms_trajectory: NDArrayFloat,
+    symprec: float = 1e-5,
+    angle_tolerance: float = -1.0,
+    chunk_size: int = 1024,
+    nonmagnetic_symmetry: NonmagneticSymmetry | None = None,
+) -> SpinSymmetryTrajectory:
+    """Track spin symmetry of spin arrangements along a trajectory on a fixed crystal structure.
+
+    Symmetry of the crystal structure is searched once.
+    Spin only groups are classified and spin rotations of each spatial operation are solved for all frames in a chunk at once.
+    See :func:`core.get_spin_symmetry` for parameters.
+
+    Parameters
+    ----------
+    magmoms_trajectory: array, (num_frames, num_sites, 3)
+        ``magmoms_trajectory[f, i, :]`` is a magnetic moment at the ``i``-th site in the ``f``-th frame.
+    chunk_size: int, default=1024
+        Number of frames processed at once
+    nonmagnetic_symmetry: :class:`group.NonmagneticSymmetry`, optional
+        Precomputed symmetry of the crystal structure
+
+    Returns
+    -------
+    trajectory: :class:`SpinSymmetryTrajectory`
+    """
+    if nonmagnetic_symmetry is None:
+        nonmagnetic_symmetry = get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance
+        )
+    labels = np.empty(len(magmoms_trajectory), dtype=np.int_)
+    return _track_spin_symmetry(
+        nonmagnetic_symmetry, magmoms_trajectory, symprec, chunk_size, labels
+    )
+
+
+def get_spin_symmetry_trajectory_from_npy(
+    lattice: NDArrayFloat,
+    positions: NDArrayFloat,
+    numbers: NDArrayInt,
+    magmoms_path: str | os.PathLike,
+    labels_path: str | os.PathLike,
+    symprec: float = 1e-5,
+    angle_tolerance: float = -1.0,
+    chunk_size: int = 1024,
+    nonmagnetic_symmetry: NonmagneticSymmetry | None = None,
+) -> SpinSymmetryTrajectory:
+    """Track spin symmetry of spin arrangements stored in a ``.npy`` file larger than memory.
+
+    Spin arrangements are read by memory mapping in chunks of ``chunk_size`` frames, and labels are written to a memory-mapped ``.npy`` file chunk by chunk.
+    Peak memory is bounded by ``chunk_size`` instead of the number of frames.
+    See :func:`get_spin_symmetry_trajectory` for the other parameters.
+
+    Parameters
+    ----------
+    magmoms_path: str or path-like
+        ``.npy`` file of an array with shape ``(num_frames, num_sites, 3)``, such as trajectories or enumerated spin arrangements
+    labels_path: str or path-like
+        ``.npy`` file to which labels with shape ``(num_frames, )`` are written
+
+    Returns
+    -------
+    trajectory: :class:`SpinSymmetryTrajectory`
+        ``labels`` is a read-only memory map of ``labels_path``.
+    """
+    magmoms_trajectory = np.load(magmoms_path, mmap_mode="r")
+    if nonmagnetic_symmetry is None:
+        nonmagnetic_symmetry = get_symmetry_with_cell(
+            lattice, positions, numbers, symprec, angle_tolerance
+        )
+    labels = open_memmap(labels_path, mode="w+", dtype=np.int_, shape=(len(magmoms_trajectory),))
+    result = _track_spin_symmetry(
+        nonmagnetic_symmetry, magmoms_trajectory, symprec, chunk_size, labels
+    )
+    labels.flush()
+    del labels
+    result.labels = np.load(labels_path, mmap_mode="r")
+    return result
+
+
+def _track_spin_symmetry(
+    nonmagnetic_symmetry: NonmagneticSymmetry,
+    magmoms_trajectory: NDArrayFloat,
+    mag_symprec: float,
+    chunk_size: int,
+    labels: NDArrayInt,
+) -> SpinSymmetryTrajectory:
+    """Write labels of frames to ``labels`` chunk by chunk."""
+    ns = nonmagnetic_symmetry
+    _, _, perms = get_operations_in_cell(ns)
+
+    num_frames = len(magmoms_trajectory)
+    signatures: dict[bytes, int] = {}
+    types_list: list[int] = []
+    valid_list: list[NDArrayBool] = []
+    representative_frames: list[int] = []
+    change_points: list[NDArrayInt] = []
+    for start in range(0, num_frames, chunk_size):
+        magmoms_chunk = np.asarray(magmoms_trajectory[start : start + chunk_size], dtype=np.float_)
+        types, valid = _classify_frames(magmoms_chunk, perms, mag_symprec)
+
+        keys = np.concatenate(
+            [types[:, None].astype(np.uint8), np.packbits(valid, axis=1)], axis=1
+        )
+        labels_chunk = np.empty(len(keys), dtype=np.int_)
+        for i, key in enumerate(keys):
+            label = signatures.setdefault(key.tobytes(), len(signatures))
+            if label == len(valid_list):
+                types_list.append(int(types[i]))
+                valid_list.append(valid[i])
+                representative_frames.append(start + i)
+            labels_chunk[i] = label
+
+        # Change points including the boundary to the previous chunk
+        if start > 0:
+            labels_chunk_with_last = np.concatenate([[labels[start - 1]], labels_chunk])
+            change_points.append(get_change_points(labels_chunk_with_last) + start - 1)
+        else:
+            change_points.append(get_change_points(labels_chunk))
+        labels[start : start + len(labels_chunk)] = labels_chunk
+
+    spin_space_groups = [
+        get_primitive_spin_symmetry(
+            ns, np.asarray(magmoms_trajectory[frame], dtype=np.float_), mag_symprec
+        )
+        for frame in representative_frames
+    ]
+
+    return SpinSymmetryTrajectory(
+        nonmagnetic_symmetry=ns,
+        labels=labels,
+        change_points=np.concatenate(change_points + [np.zeros(0, dtype=np.int_)]),
+        spin_only_group_types=np.array(types_list, dtype=np.int_),
+        valid=np.array(valid_list, dtype=bool).reshape(-1, len(perms)),
+        representative_frames=np.array(representative_frames, dtype=np.int_),
+        spin_space_groups=spin_space_groups,
+    )
+
+
+def get_change_points(labels: NDArrayInt) -> NDArrayInt:
+    """Return indices ``f`` with ``labels[f] != labels[f - 1]``."""
+    labels = np.asarray(labels)
+    return np.nonzero(labels[1:] != labels[:-1])[0] + 1
+
+
+def _classify_frames(
+    magmoms_chunk: NDArrayFloat, perms: NDArrayInt, mag_symprec: float
+) -> tuple[NDArrayInt, NDArrayBool]:
+    """Return types of spin only groups, (F, ), and validity of operations, (F, K), of frames."""
+    types, _ = get_spin_only_group_types(magmoms_chunk, mag_symprec)
+    valid = np.zeros((len(magmoms_chunk), len(perms)), dtype=bool)
+    # Any spatial operation admits a spin rotation for nonmagnetic frames
+    nonmagnetic = types == SpinOnlyGroupType.NONMAGNETIC.value
+    valid[nonmagnetic] = True
+    magnetic = np.nonzero(~nonmagnetic)[0]
+    if len(magnetic) == 0:
+        return types, valid
+
+    magmoms = magmoms_chunk[magnetic]
+    for k, perm in enumerate(perms):
+        # Search W in O(3) s.t. magmoms @ W.T = magmoms[:, perm] for all frames at once
+        _, residuals = solve_procrustes_batch(magmoms, magmoms[:, perm])
+        valid[magnetic, k] = residuals < mag_symprec
+    return types, valid
@@ -1,6 +1,8 @@
 """Utility functions."""
 from __future__ import annotations
 
+from threading import Event
+from time import perf_counter
 from typing import Any
 
 import numpy as np
@@ -9,9 +11,10 @@ from typing_extensions import TypeAlias  # for Python<3.10
 
 NDArrayInt: TypeAlias = NDArray[np.int_]
 NDArrayFloat: TypeAlias = NDArray[np.float_]
+NDArrayBool: TypeAlias = NDArray[np.bool_]
 
 
-def ndarray2d_to_integer_tuple(array: NDArrayFloat) -> tuple[tuple[Any]]:
+def ndarray2d_to_integer_tuple(array: NDArrayFloat | NDArrayInt) -> tuple[tuple[Any]]:
     """Convert two-dimensional array to tuple of tuple."""
     array_int = np.around(array).astype(int)
     array_t = tuple(map(tuple, array_int.tolist()))
@@ -22,3 +25,45 @@ def is_integer_array(array: NDArrayFloat, rtol: float = 1e-5, atol: float = 1e-8
     """Return true if all values of ``array`` are almost integers."""
     array_int = np.around(array).astype(int)
     return np.allclose(array_int, array, rtol=rtol, atol=atol)
+
+
+class PartialResultWarning(UserWarning):
+    """Warning for results of searches stopped by :class:`Deadline`."""
+
+
+class Deadline:
+    """Time budget and cancellation token for symmetry searches.
+
+    Searches check :meth:`is_set` between operations and return what they have verified so far, flagged as partial, once it becomes true.
+    An object with ``is_set()`` such as :class:`threading.Event` can be used in place of :class:`Deadline` for cancellation only.
+
+    Parameters
+    ----------
+    timeout: float, optional
+        Time budget in seconds from creation. If not given, only :meth:`cancel` stops searches.
+    event: :class:`threading.Event`, optional
+        Cancellation token shared with other threads. A new one is created if not given.
+    """
+
+    def __init__(self, timeout: float | None = None, event: Event | None = None):
+        self._end = None if timeout is None else perf_counter() + timeout
+        self._event = Event() if event is None else event
+
+    def cancel(self):
+        """Stop searches checking this deadline."""
+        self._event.set()
+
+    def is_set(self) -> bool:
+        """Return true if cancelled or the time budget is exhausted."""
+        if self._event.is_set():
+            return True
+        return self._end is not None and perf_counter() >= self._end
+
+    @property
+    def remaining(self) -> float:
+        """Return remaining time in seconds, zero if cancelled, and infinity without time budget."""
+        if self._event.is_set():
+            return 0.0
+        if self._end is None:
+            return float("inf")
+        return max(self._end - perf_counter(), 0.0)
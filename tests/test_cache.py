@@ -0,0 +1,94 @@
+import numpy as np
+
+from spinspg.cache import (
+    CacheInfo,
+    NonmagneticSymmetryCache,
+    PersistentSymmetryCache,
+    get_cell_fingerprint,
+)
+from spinspg.core import get_spin_symmetry
+
+
+def test_cell_fingerprint(rutile):
+    lattice, positions, numbers, _ = rutile
+    symprec = 1e-5
+    key = get_cell_fingerprint(lattice, positions, numbers, symprec, -1)
+
+    # Tiny displacements and lattice translations are ignored
+    assert get_cell_fingerprint(lattice, positions + 1e-9, numbers, symprec, -1) == key
+    shifted = np.array(positions, dtype=np.float_)
+    shifted[0] += [1, 0, -1]
+    assert get_cell_fingerprint(lattice, shifted, numbers, symprec, -1) == key
+
+    # Different structures or tolerances
+    assert get_cell_fingerprint(lattice, positions + 1e-2, numbers, symprec, -1) != key
+    assert get_cell_fingerprint(lattice, positions, numbers, 1e-3, -1) != key
+    assert get_cell_fingerprint(lattice, positions[::-1], numbers[::-1], symprec, -1) != key
+
+
+def test_nonmagnetic_symmetry_cache(rutile, Cr_in_Cr2O3):
+    cache = NonmagneticSymmetryCache(maxsize=1)
+    lattice, positions, numbers, magmoms = rutile
+
+    _, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, magmoms, cache=cache)
+    _, rotations_cached, _, _ = get_spin_symmetry(
+        lattice, positions, numbers, -magmoms, cache=cache
+    )
+    assert np.allclose(rotations, rotations_cached)
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    # Least recently used entry is dropped
+    get_spin_symmetry(*Cr_in_Cr2O3, cache=cache)
+    assert not cache.invalidate(lattice, positions, numbers, 1e-5, -1)
+    assert cache.invalidate(*Cr_in_Cr2O3[:3], 1e-5, -1)
+    assert len(cache) == 0
+
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=1, currsize=0)
+
+
+def test_persistent_symmetry_cache(tmp_path, rutile, Cr_in_Cr2O3):
+    path = tmp_path / "spinspg.sqlite"
+    lattice, positions, numbers, magmoms = rutile
+    expected = get_spin_symmetry(lattice, positions, numbers, magmoms)
+
+    cache = PersistentSymmetryCache(path)
+    get_spin_symmetry(lattice, positions, numbers, magmoms, cache=cache)
+    assert len(cache) == 2  # Crystal structure and spin arrangement
+    cache.close()
+
+    # Another instance, e.g. a restarted job, reuses stored results
+    other = PersistentSymmetryCache(path)
+    actual = get_spin_symmetry(lattice, positions, numbers, magmoms, cache=other)
+    assert other.info().hits == 1
+    assert actual[0].spin_only_group_type == expected[0].spin_only_group_type
+    for a, b in zip(actual[1:], expected[1:]):
+        assert np.allclose(a, b)
+
+    # Crystal structure is shared by another spin arrangement
+    get_spin_symmetry(lattice, positions, numbers, -magmoms, cache=other)
+    assert other.info().hits == 2
+    assert len(other) == 3
+    other.close()
+
+
+def test_persistent_symmetry_cache_eviction(tmp_path, rutile, Cr_in_Cr2O3, monkeypatch):
+    path = tmp_path / "spinspg.sqlite"
+    cache = PersistentSymmetryCache(path)
+    get_spin_symmetry(*rutile, cache=cache)
+    num_bytes = cache.num_bytes
+    cache.close()
+
+    # Least recently used entries are dropped beyond max_bytes
+    cache = PersistentSymmetryCache(path, max_bytes=num_bytes)
+    get_spin_symmetry(*Cr_in_Cr2O3, cache=cache)
+    assert cache.num_bytes <= num_bytes
+    assert len(cache) < 4
+    cache.close()
+
+    # Entries of other versions are dropped
+    monkeypatch.setattr("spinspg.cache._get_spinspg_version", lambda: "0.0.0")
+    cache = PersistentSymmetryCache(path)
+    assert len(cache) == 0
+    cache.close()
@@ -1,10 +1,28 @@
 import numpy as np
 import pytest
-from spglib import get_magnetic_symmetry
+from spglib import get_magnetic_symmetry, get_symmetry_dataset
 
-from spinspg.core import get_spin_symmetry
-from spinspg.group import get_primitive_spin_symmetry, get_symmetry_with_cell
+import spinspg.group
+from spinspg.core import (
+    get_spin_symmetry,
+    get_spin_symmetry_batch,
+    get_spin_symmetry_operations,
+)
+from spinspg.group import (
+    ParentSymmetry,
+    get_anchor_sites,
+    get_primitive_lattice_from_centerings,
+    get_primitive_spin_symmetry,
+    get_primitive_spin_symmetry_batch,
+    get_spin_translation_lattice,
+    get_stg_centerings,
+    get_symmetry_from_operations,
+    get_symmetry_with_cell,
+    prefilter_permutations,
+)
+from spinspg.permutation import get_symmetry_permutations
 from spinspg.spin import SpinOnlyGroupType
+from spinspg.utils import Deadline, PartialResultWarning, is_integer_array
 
 
 def test_get_symmetry_with_cell(fcc):
@@ -14,6 +32,36 @@ def test_get_symmetry_with_cell(fcc):
     assert symmetry.prim_centerings.shape == (4, 3)
 
 
+@pytest.mark.parametrize("testcase", ["fcc", "Cr_in_Cr2O3", "Mn_in_Mn3ReO6"])
+def test_get_symmetry_from_operations(request, testcase):
+    lattice, positions, numbers, magmoms = request.getfixturevalue(testcase)
+    dataset = get_symmetry_dataset((lattice, positions, numbers), 1e-5)
+    rotations = dataset.rotations
+    translations = dataset.translations
+    permutations = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, 1e-5
+    )
+    assert len(permutations) == len(rotations)
+
+    # Primitive lattice from centerings spans the same lattice as spglib's one
+    centerings = translations[np.all(rotations == np.eye(3, dtype=int), axis=(1, 2))]
+    prim_lattice = get_primitive_lattice_from_centerings(lattice, centerings)
+    tmat = np.linalg.inv(prim_lattice.T) @ dataset.primitive_lattice.T
+    assert np.allclose(tmat, np.around(tmat))
+    assert np.isclose(np.abs(np.linalg.det(tmat)), 1)
+
+    ns = get_symmetry_from_operations(
+        lattice, positions, numbers, rotations, translations, 1e-5, permutations=permutations
+    )
+    expected = get_spin_symmetry(lattice, positions, numbers, magmoms)
+    actual = get_spin_symmetry(lattice, positions, numbers, magmoms, nonmagnetic_symmetry=ns)
+    assert actual[0].spin_only_group_type == expected[0].spin_only_group_type
+    assert len(actual[1]) == len(expected[1])
+    assert {ndarray.tobytes() for ndarray in actual[1]} == {
+        ndarray.tobytes() for ndarray in expected[1]
+    }
+
+
 def test_spin_space_group_fcc(fcc):
     lattice, positions, numbers, magmoms = fcc
     symprec = 1e-5
@@ -209,3 +257,278 @@ def test_get_spin_symmetry(rutile):
                 found[i] = True
 
     assert all(found)
+
+
+@pytest.mark.parametrize("testcase", ["fcc", "rutile", "Mn_in_Mn3ReO6", "Ni_in_NiTa2O6"])
+def test_get_symmetry_with_generators(request, testcase):
+    lattice, positions, numbers, _ = request.getfixturevalue(testcase)
+    expect = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    actual = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1, use_generators=True)
+    for perm1, perm2 in zip(actual.prim_permutations, expect.prim_permutations):
+        assert np.all(perm1.permutation == perm2.permutation)
+    for perm1, perm2 in zip(
+        actual.prim_centering_permutations, expect.prim_centering_permutations
+    ):
+        assert np.all(perm1.permutation == perm2.permutation)
+
+
+def test_get_spin_symmetry_batch(rutile):
+    lattice, positions, numbers, magmoms = rutile
+    ferro = np.abs(magmoms)
+    magmoms_stack = np.array([magmoms, ferro, magmoms])
+    batch = get_spin_symmetry_batch(lattice, positions, numbers, magmoms_stack)
+
+    assert len(batch) == 3
+    assert len(batch.spin_space_groups) == 2
+    assert batch[0] is batch[2]
+    assert batch.throughput > 0
+    for i, magmoms_i in enumerate(magmoms_stack):
+        _, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, magmoms_i)
+        assert batch.num_operations[i] == len(rotations)
+
+
+def test_get_primitive_spin_symmetry_batch(fcc, monkeypatch):
+    lattice, positions, numbers, magmoms = fcc
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    magmoms = np.array(magmoms, dtype=np.float_)
+    rotation = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]], dtype=np.float_)
+    magmoms_stack = np.array(
+        [
+            magmoms,
+            magmoms @ rotation.T,  # Same spin only group type and centerings as above
+            np.tile([0, 0, 1], (len(magmoms), 1)),
+            np.zeros_like(magmoms),
+            [[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]],
+        ],
+        dtype=np.float_,
+    )
+
+    # Lattices of maximal space subgroups are computed once for each group of spin arrangements
+    calls = []
+    original = spinspg.group.get_spin_translation_lattice
+
+    def counting(*args):
+        calls.append(None)
+        return original(*args)
+
+    monkeypatch.setattr(spinspg.group, "get_spin_translation_lattice", counting)
+    spin_space_groups = get_primitive_spin_symmetry_batch(ns, magmoms_stack, 1e-5)
+    assert len(calls) == len(magmoms_stack) - 1
+
+    monkeypatch.undo()
+    for magmoms_i, actual in zip(magmoms_stack, spin_space_groups):
+        expect = get_primitive_spin_symmetry(ns, magmoms_i, 1e-5)
+        assert actual.spin_only_group.spin_only_group_type == (
+            expect.spin_only_group.spin_only_group_type
+        )
+        assert len(actual.nontrivial_coset) == len(expect.nontrivial_coset)
+        assert len(actual.spin_translation_coset) == len(expect.spin_translation_coset)
+        assert len(actual.prim_centerings) == len(expect.prim_centerings)
+
+
+def test_closure_pruning(fcc):
+    lattice, positions, numbers, _ = fcc
+    magmoms = np.array([[0, 0, 1], [0, 0, 1], [1, 0, 0], [0, 1, 0]], dtype=np.float_)
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5)
+    assert ssg.spin_only_group.spin_only_group_type == SpinOnlyGroupType.NONCOPLANAR
+
+    # Unpruned search solves all prefiltered centerings of each coset representative compatible
+    # with the lattice of maximal space subgroup
+    is_stg_centering = get_stg_centerings(ns, magmoms[None], 1e-5)[0]
+    tmat_stg, _, _, _ = get_spin_translation_lattice(ns, is_stg_centering)
+    centering_perms = ns.prim_centering_permutations.permutations
+    num_unpruned = np.sum(prefilter_permutations(magmoms, centering_perms, 1e-5))
+    for rot, perm in zip(ns.prim_rotations, ns.prim_permutations.permutations):
+        if is_integer_array(np.linalg.inv(tmat_stg) @ rot @ tmat_stg):
+            num_unpruned += np.sum(prefilter_permutations(magmoms, centering_perms[:, perm], 1e-5))
+    assert num_unpruned == 34
+    assert ssg.num_procrustes_solves == 12
+
+
+def test_collinear_without_procrustes(Ni_in_NiTa2O6):
+    lattice, positions, numbers, magmoms = Ni_in_NiTa2O6
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5)
+    assert ssg.spin_only_group.spin_only_group_type == SpinOnlyGroupType.COLLINEAR
+    assert ssg.num_procrustes_solves == 0
+
+    axis = ssg.spin_only_group.axis
+    flip = np.eye(3) - 2 * np.outer(axis, axis)
+    for ops in ssg.nontrivial_coset + ssg.spin_translation_coset:
+        assert np.allclose(ops.spin_rotation, np.eye(3)) or np.allclose(ops.spin_rotation, flip)
+
+
+def test_coplanar_without_procrustes(layer_triangular_kagome):
+    lattice, positions, numbers, magmoms = layer_triangular_kagome
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5)
+    assert ssg.spin_only_group.spin_only_group_type == SpinOnlyGroupType.COPLANAR
+    assert ssg.num_procrustes_solves == 0
+
+    axis = ssg.spin_only_group.axis
+    for ops in ssg.nontrivial_coset + ssg.spin_translation_coset:
+        W = ops.spin_rotation
+        assert np.allclose(W @ W.T, np.eye(3))
+        assert np.allclose(W @ axis, axis)
+
+
+def test_prefilter_permutations():
+    magmoms = np.array(
+        [
+            [0, 0, 1],
+            [0, 0, 1],
+            [0, 0, -1],
+            [0, 0, 2],
+        ],
+        dtype=np.float_,
+    )
+    perms = np.array(
+        [
+            [0, 1, 2, 3],  # identity
+            [2, 0, 1, 3],  # breaks inner products of the first three sites
+            [3, 1, 2, 0],  # breaks magnitudes
+            [1, 0, 2, 3],  # swaps parallel moments
+        ]
+    )
+    mask = prefilter_permutations(magmoms, perms, mag_symprec=1e-5)
+    assert mask.tolist() == [True, False, False, True]
+    # Without anchors, only magnitudes are compared
+    mask = prefilter_permutations(magmoms, perms, mag_symprec=1e-5, num_anchors=0)
+    assert mask.tolist() == [True, True, False, True]
+
+
+@pytest.fixture
+def noncoplanar_fcc_supercell(fcc):
+    lattice, positions, numbers, _ = fcc
+    shifts = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+    positions = ((positions[None, :, :] + shifts[:, None, :]) / 2).reshape(-1, 3)
+    magmoms = np.tile(np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]), (8, 1))
+    return 2 * lattice, positions, np.tile(numbers, 8), magmoms
+
+
+@pytest.mark.parametrize("noise", [0, 0.49])
+@pytest.mark.parametrize(
+    "testcase",
+    [
+        "fcc",
+        "triangular_kagome",
+        "rutile",
+        "Mn_in_Mn3ReO6",
+        "Ni_in_NiTa2O6",
+        "noncoplanar_fcc_supercell",
+    ],
+)
+def test_staged_verification(request, testcase, noise):
+    lattice, positions, numbers, magmoms = request.getfixturevalue(testcase)
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    # Noise close to tolerance, where spin rotations from anchors alone may fail
+    mag_symprec = 1e-2 if noise > 0 else 1e-5
+    rng = np.random.default_rng(0)
+    magmoms = np.array(magmoms, dtype=np.float_)
+    magmoms += noise * mag_symprec * rng.normal(size=magmoms.shape) / np.sqrt(3)
+    expect = get_primitive_spin_symmetry(ns, magmoms, mag_symprec)
+    actual = get_primitive_spin_symmetry(ns, magmoms, mag_symprec, staged=True)
+
+    assert len(actual.spin_translation_coset) == len(expect.spin_translation_coset)
+    assert len(actual.nontrivial_coset) == len(expect.nontrivial_coset)
+    for ops1, ops2 in zip(actual.nontrivial_coset, expect.nontrivial_coset):
+        assert np.allclose(ops1.rotation, ops2.rotation)
+        assert np.allclose(ops1.spin_rotation, ops2.spin_rotation)
+
+
+def test_get_anchor_sites(triangular_kagome):
+    _, _, _, magmoms = triangular_kagome
+    anchors = get_anchor_sites(magmoms, 1e-5)
+    assert len(anchors) == 2  # coplanar
+    assert np.linalg.matrix_rank(magmoms[anchors]) == 2
+
+
+def test_parent_symmetry(fcc):
+    lattice, positions, _, _ = fcc
+    parent = ParentSymmetry.from_cell(lattice, positions, 1e-5, -1)
+    assert len(parent.rotations) == 48 * 4
+
+    # L1_2 ordering
+    numbers = np.array([0, 1, 1, 1])
+    ns = parent.decorate(numbers)
+    expected = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    assert len(ns.prim_rotations) == len(expected.prim_rotations) == 48
+    assert len(ns.prim_centerings) == len(expected.prim_centerings) == 1
+
+    magmoms = np.array([[0, 0, 1], [0, 0, 0], [0, 0, 0], [0, 0, 0]], dtype=np.float_)
+    _, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, magmoms)
+    _, rotations_parent, _, _ = get_spin_symmetry(
+        lattice, positions, numbers, magmoms, nonmagnetic_symmetry=ns
+    )
+    assert len(rotations_parent) == len(rotations)
+
+
+class _CountingDeadline:
+    """Deadline set after ``budget`` checks."""
+
+    def __init__(self, budget):
+        self.budget = budget
+
+    def is_set(self):
+        self.budget -= 1
+        return self.budget < 0
+
+
+def _operation_keys(rotations, translations):
+    return {
+        (tuple(rot.ravel()), tuple(np.around(np.remainder(trans, 1), 6).ravel() % 1))
+        for rot, trans in zip(rotations, translations)
+    }
+
+
+@pytest.mark.parametrize("budget", [0, 3, 10])
+def test_deadline(Mn_in_Mn3ReO6, budget):
+    lattice, positions, numbers, magmoms = Mn_in_Mn3ReO6
+    _, rotations, translations, _ = get_spin_symmetry(lattice, positions, numbers, magmoms)
+
+    with pytest.warns(PartialResultWarning):
+        _, rotations_partial, translations_partial, _ = get_spin_symmetry(
+            lattice, positions, numbers, magmoms, deadline=_CountingDeadline(budget)
+        )
+    # Operations verified before the deadline are returned
+    assert len(rotations_partial) < len(rotations)
+    assert _operation_keys(rotations_partial, translations_partial) <= _operation_keys(
+        rotations, translations
+    )
+
+    # Enough budget
+    operations = get_spin_symmetry_operations(
+        lattice, positions, numbers, magmoms, deadline=_CountingDeadline(1000)
+    )
+    assert not operations.is_partial
+    assert len(operations) == len(rotations)
+
+
+def test_deadline_cancel(fcc):
+    lattice, positions, numbers, magmoms = fcc
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    deadline = Deadline()
+    assert not deadline.is_set()
+    assert deadline.remaining == np.inf
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5, deadline=deadline)
+    assert not ssg.is_partial
+
+    deadline.cancel()
+    assert deadline.is_set()
+    assert deadline.remaining == 0
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5, deadline=deadline)
+    assert ssg.is_partial
+    assert len(ssg.nontrivial_coset) == 0
+
+    ns_partial = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1, deadline=deadline)
+    assert ns_partial.is_partial
+    assert ns_partial.prim_rotations.shape == (0, 3, 3)
+    assert ns_partial.prim_translations.shape == (0, 3)
+    parent = ParentSymmetry.from_nonmagnetic_symmetry(ns_partial, lattice, positions)
+    assert len(parent.rotations) == 0
+    operations = get_spin_symmetry_operations(
+        lattice, positions, numbers, magmoms, deadline=Deadline(timeout=0)
+    )
+    assert operations.is_partial
+    assert len(operations) == 0
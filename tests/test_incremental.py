@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from spinspg.core import get_spin_symmetry
+from spinspg.group import get_symmetry_with_cell
+from spinspg.incremental import IncrementalSpinSymmetry
+from spinspg.spin import solve_procrustes_batch
+
+
+def _get_valid_operations_brute_force(magmoms, permutations, mag_symprec):
+    _, residuals = solve_procrustes_batch(magmoms[None, :, :], magmoms[permutations])
+    return residuals < mag_symprec
+
+
+@pytest.mark.parametrize("testcase", ["Ni_in_NiTa2O6", "fcc", "Mn_in_Mn3ReO6"])
+def test_incremental_spin_symmetry(request, testcase):
+    lattice, positions, numbers, magmoms = request.getfixturevalue(testcase)
+    magmoms = np.array(magmoms, dtype=np.float_)
+    mag_symprec = 1e-5
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    incremental = IncrementalSpinSymmetry(ns, magmoms, mag_symprec)
+
+    _, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, magmoms)
+    assert np.sum(incremental.get_valid_operations()) == len(rotations)
+
+    rng = np.random.default_rng(0)
+    num_sites = len(magmoms)
+    for _ in range(20):
+        # Flip a moment and occasionally restore the original arrangement
+        if rng.random() < 0.3:
+            sites = np.arange(num_sites)
+            new_magmoms = magmoms
+        else:
+            sites = rng.choice(num_sites, size=min(2, num_sites), replace=False)
+            new_magmoms = -incremental.magmoms[sites]
+        incremental.update(sites, new_magmoms)
+        expected = _get_valid_operations_brute_force(
+            np.array(incremental.magmoms), incremental.permutations, mag_symprec
+        )
+        assert np.all(incremental.get_valid_operations() == expected)
+
+    incremental.update(np.arange(num_sites), magmoms)
+    assert np.sum(incremental.get_valid_operations()) == len(rotations)
+    ssg = incremental.get_spin_space_group()
+    assert len(ssg.nontrivial_coset) * len(ssg.spin_translation_coset) * len(
+        ssg.prim_centerings
+    ) == len(rotations)
+
+
+def test_incremental_recomputations(Ni_in_NiTa2O6):
+    lattice, positions, numbers, magmoms = Ni_in_NiTa2O6
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    incremental = IncrementalSpinSymmetry(ns, magmoms, 1e-5)
+    num_operations = incremental.num_operations
+    initial = incremental.num_recomputations
+
+    # Flipping a spin and flipping it back keeps spin rotations on the collinear axis
+    for _ in range(5):
+        incremental.update([0], -incremental.magmoms[[0]])
+        incremental.get_valid_operations()
+    assert incremental.num_recomputations - initial < 5 * num_operations
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_incremental_recomputations_noncollinear(fcc, symmetric):
+    lattice, positions, numbers, _ = fcc
+    shifts = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+    positions = ((positions[None, :, :] + shifts[:, None, :]) / 2).reshape(-1, 3)
+    numbers = np.tile(numbers, len(shifts))
+    ns = get_symmetry_with_cell(2 * lattice, positions, numbers, 1e-5, -1)
+    rng = np.random.default_rng(0)
+    if symmetric:
+        # Noncoplanar arrangement starting with many valid operations
+        magmoms = np.tile(np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]), (8, 1))
+    else:
+        magmoms = rng.normal(size=(len(positions), 3))
+    mag_symprec = 1e-5
+    incremental = IncrementalSpinSymmetry(ns, magmoms, mag_symprec)
+    initial = incremental.num_recomputations
+
+    # Random non-collinear moments at single sites
+    num_steps = 10
+    for _ in range(num_steps):
+        site = rng.integers(len(positions))
+        incremental.update([site], rng.normal(size=(1, 3)))
+        expected = _get_valid_operations_brute_force(
+            np.array(incremental.magmoms), incremental.permutations, mag_symprec
+        )
+        assert np.all(incremental.get_valid_operations() == expected)
+    # Clearly invalid operations are rejected from cross-covariance matrices without per-site residuals
+    assert incremental.num_recomputations - initial < incremental.num_operations
@@ -0,0 +1,77 @@
+import tracemalloc
+
+import numpy as np
+
+from spinspg.core import get_spin_symmetry
+from spinspg.group import get_operations_in_cell, get_symmetry_with_cell
+from spinspg.ising import get_ising_symmetry_classes
+
+
+def test_ising_symmetry_classes(Cr_in_Cr2O3):
+    lattice, positions, numbers, magmoms = Cr_in_Cr2O3
+    symprec = 1e-5
+    ns = get_symmetry_with_cell(lattice, positions, numbers, symprec, -1)
+
+    rng = np.random.default_rng(0)
+    spins = np.concatenate(
+        [
+            (magmoms[None, :, 0] > 0).astype(np.uint8),
+            np.ones((1, len(positions)), dtype=np.uint8),
+            np.zeros((1, len(positions)), dtype=np.uint8),
+            rng.integers(0, 2, size=(5, len(positions)), dtype=np.uint8),
+        ]
+    )
+    packed = np.packbits(spins, axis=1)
+    packed[:, -1] |= 0b00001111  # Padding bits should be ignored
+    classes = get_ising_symmetry_classes(ns, packed, chunk_size=3)
+
+    assert len(classes.labels) == len(spins)
+    assert classes.labels[1] == classes.labels[2]  # all up and all down
+    for spin, label in zip(spins, classes.labels):
+        sign = 2 * spin.astype(np.float_) - 1
+        ising_magmoms = sign[:, None] * np.array([[1, 0, 0]])
+        _, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, ising_magmoms)
+        keep, flip = classes.keep[label], classes.flip[label]
+        assert np.sum(keep | flip) == len(rotations)
+        assert not np.any(keep & flip)
+
+
+def test_ising_symmetry_classes_supercell(fcc):
+    lattice, positions, numbers, _ = fcc
+    shifts = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+    positions = ((positions[None, :, :] + shifts[:, None, :]) / 2).reshape(-1, 3)
+    numbers = np.tile(numbers, len(shifts))
+    ns = get_symmetry_with_cell(2 * lattice, positions, numbers, 1e-5, -1)
+    _, _, perms = get_operations_in_cell(ns)
+    assert perms.shape == (1536, 32)
+
+    rng = np.random.default_rng(0)
+    spins = rng.integers(0, 2, size=(64, len(positions)), dtype=np.uint8)
+    spins[:8] = np.arange(len(positions))[None, :] % 2  # Arrangements with many operations
+    classes = get_ising_symmetry_classes(ns, np.packbits(spins, axis=1), max_memory=1 << 16)
+
+    assert np.all(np.diff(np.unique(classes.labels, return_index=True)[1]) > 0)
+    for spin, label in zip(spins, classes.labels):
+        assert np.all(classes.keep[label] == np.all(spin[perms] == spin[None, :], axis=1))
+        assert np.all(classes.flip[label] == np.all(spin[perms] != spin[None, :], axis=1))
+
+
+def test_ising_symmetry_classes_memory(fcc):
+    lattice, positions, numbers, _ = fcc
+    shifts = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+    positions = ((positions[None, :, :] + shifts[:, None, :]) / 2).reshape(-1, 3)
+    numbers = np.tile(numbers, len(shifts))
+    ns = get_symmetry_with_cell(2 * lattice, positions, numbers, 1e-5, -1)
+
+    # All pairs of ferromagnetic arrangements and operations pass the first permuted byte
+    packed = np.packbits(np.ones((3000, len(positions)), dtype=np.uint8), axis=1)
+    max_memory = 1 << 23
+    tracemalloc.start()
+    try:
+        classes = get_ising_symmetry_classes(ns, packed, max_memory=max_memory)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 2 * max_memory
+    assert classes.num_classes == 1
+    assert np.all(classes.keep[0])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from spinspg.core import get_spin_symmetry_operations
+from spinspg.group import get_primitive_spin_symmetry, get_symmetry_with_cell
+
+
+def test_spin_symmetry_operations(Cr_in_Cr2O3):
+    lattice, positions, numbers, magmoms = Cr_in_Cr2O3
+    operations = get_spin_symmetry_operations(lattice, positions, numbers, magmoms)
+
+    # Compare with eager products of cosets
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+    ssg = get_primitive_spin_symmetry(ns, magmoms, 1e-5)
+    tmat = ssg.transformation
+    invtmat = np.linalg.inv(tmat)
+    expected = []
+    for ops in ssg.nontrivial_coset:
+        for ops_st in ssg.spin_translation_coset:
+            for centering in ssg.prim_centerings:
+                expected.append(
+                    (
+                        np.around(invtmat @ ops.rotation @ tmat),
+                        np.remainder(
+                            invtmat @ (ops.translation + ops_st.translation + centering), 1
+                        ),
+                        ops_st.spin_rotation @ ops.spin_rotation,
+                    )
+                )
+    assert len(operations) == len(expected)
+
+    for i, (rotation, translation, spin_rotation) in enumerate(operations):
+        assert np.allclose(rotation, expected[i][0])
+        assert np.allclose(translation, expected[i][1])
+        assert np.allclose(spin_rotation, expected[i][2])
+
+    rotations, translations, spin_rotations = operations.to_arrays()
+    assert rotations.shape == (len(operations), 3, 3)
+
+    # Index and slice access
+    rotation, translation, spin_rotation = operations[-1]
+    assert np.allclose(rotation, rotations[-1])
+    assert np.allclose(translation, translations[-1])
+    assert np.allclose(spin_rotation, spin_rotations[-1])
+    sliced = operations[1:10:3]
+    assert np.allclose(sliced[0], rotations[1:10:3])
+    assert np.allclose(sliced[1], translations[1:10:3])
+    assert np.allclose(sliced[2], spin_rotations[1:10:3])
+
+    # Chunked iteration
+    chunks = list(operations.iter_chunks(chunk_size=5))
+    assert len(chunks) == (len(operations) + 4) // 5
+    assert np.allclose(np.concatenate([chunk[1] for chunk in chunks]), translations)
+
+
+def test_to_arrays_with_buffers(Ni_in_NiTa2O6):
+    lattice, positions, numbers, magmoms = Ni_in_NiTa2O6
+    operations = get_spin_symmetry_operations(lattice, positions, numbers, magmoms)
+    size = len(operations)
+    expected = operations.take(np.arange(size))
+
+    # Expansion by broadcasting matches gathering
+    for actual, desired in zip(operations.to_arrays(), expected):
+        assert np.allclose(actual, desired)
+
+    # Reuse larger buffers
+    out = (
+        np.zeros((size + 3, 3, 3), dtype=np.int_),
+        np.zeros((size + 3, 3)),
+        np.zeros((size + 3, 3, 3)),
+    )
+    for _ in range(2):
+        arrays = operations.to_arrays(out=out)
+        for actual, desired, buffer in zip(arrays, expected, out):
+            assert len(actual) == size
+            assert np.shares_memory(actual, buffer)
+            assert np.allclose(actual, desired)
+
+    with pytest.raises(ValueError):
+        operations.to_arrays(out=tuple(buffer[: size - 1] for buffer in out))
@@ -1,7 +1,16 @@
+from threading import Event
+
 import numpy as np
 from spglib import get_symmetry_dataset
 
-from spinspg.permutation import get_symmetry_permutations
+from spinspg.permutation import (
+    Permutation,
+    PermutationGroup,
+    get_symmetry_permutations,
+    get_symmetry_permutations_from_generators,
+    verify_permutations,
+)
+from spinspg.utils import Deadline
 
 
 def test_symmetry_permutations(fcc):
@@ -17,3 +26,194 @@ def test_symmetry_permutations(fcc):
     assert len(permutations) == len(rotations)
     for permutation in permutations:
         assert np.all(np.sort(permutation.permutation) == np.arange(len(positions)))
+
+
+def test_symmetry_permutations_with_species(rutile):
+    lattice, positions, numbers, _ = rutile
+    symprec = 1e-5
+    dataset = get_symmetry_dataset((lattice, positions, numbers), symprec)
+    rotations = dataset["rotations"]
+    translations = dataset["translations"]
+    permutations = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec
+    )
+    # Chunking by a tiny memory budget should not change the result
+    permutations_chunked = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec, max_memory=1
+    )
+
+    assert len(permutations) == len(rotations)
+    for rot, trans, perm, perm2 in zip(
+        rotations, translations, permutations, permutations_chunked
+    ):
+        assert np.all(perm.permutation == perm2.permutation)
+        assert np.all(numbers[perm.permutation] == numbers)
+        diff = positions @ rot.T + trans[None, :] - positions[perm.permutation]
+        assert np.allclose(diff, np.rint(diff))
+
+
+def test_symmetry_permutations_from_generators(Mn_in_Mn3ReO6):
+    lattice, positions, numbers, _ = Mn_in_Mn3ReO6
+    symprec = 1e-5
+    dataset = get_symmetry_dataset((lattice, positions, numbers), symprec)
+    rotations = dataset["rotations"]
+    translations = dataset["translations"]
+    # Coset representatives w.r.t. centerings
+    indices = [i for i, rot in enumerate(rotations) if np.allclose(rot, np.eye(3))]
+    centerings = translations[indices]
+    uniq = {}
+    for i, rot in enumerate(rotations):
+        uniq.setdefault(rot.tobytes(), i)
+    uniq_indices = list(uniq.values())
+
+    perms, centering_perms = get_symmetry_permutations_from_generators(
+        lattice,
+        positions,
+        numbers,
+        rotations[uniq_indices],
+        translations[uniq_indices],
+        centerings,
+        symprec,
+    )
+    expect = get_symmetry_permutations(
+        lattice, positions, numbers, rotations[uniq_indices], translations[uniq_indices], symprec
+    )
+    expect_centerings = get_symmetry_permutations(
+        lattice, positions, numbers, rotations[indices], centerings, symprec
+    )
+    assert len(perms) == len(uniq_indices)
+    assert len(centering_perms) == len(centerings)
+    for perm1, perm2 in zip(
+        list(perms) + list(centering_perms), list(expect) + list(expect_centerings)
+    ):
+        assert np.all(perm1.permutation == perm2.permutation)
+
+
+def test_permutation_group(monkeypatch):
+    # Symmetric group on three points
+    group = PermutationGroup(
+        np.array([[0, 1, 2], [1, 2, 0], [2, 0, 1], [1, 0, 2], [2, 1, 0], [0, 2, 1]])
+    )
+    assert group.permutations.dtype == np.int32
+    assert len(group) == 6
+    assert isinstance(group[1], Permutation)
+    assert len(group[1:3]) == 2
+
+    # Compare with elementwise products
+    table = group.get_composition_table()
+    for a in range(6):
+        for b in range(6):
+            expect = group[a] * group[b]
+            assert np.all(group.permutations[table[a, b]] == expect.permutation)
+            assert np.all(group.compose(a, b) == expect.permutation)
+
+    inverses = group.inverse()
+    for perm, inv in zip(group.permutations, inverses.permutations):
+        assert np.all(perm[inv] == np.arange(3))
+
+    assert [cycle.tolist() for cycle in group.get_cycles(1)] == [[0, 1, 2]]
+    assert [cycle.tolist() for cycle in group.get_cycles(3)] == [[0, 1], [2]]
+    assert group.get_orbits().tolist() == [0, 0, 0]
+    assert group[[0, 5]].get_orbits().tolist() == [0, 1, 1]
+    assert np.all(group[[0, 5]].get_composition_table() == [[0, 1], [1, 0]])
+
+    # Lookup of stored permutations is built once for the whole table
+    calls = []
+    original = PermutationGroup._get_lookup
+
+    def counting(self):
+        calls.append(None)
+        return original(self)
+
+    monkeypatch.setattr(PermutationGroup, "_get_lookup", counting)
+    assert np.all(group.get_composition_table() == table)
+    assert len(calls) == 1
+
+
+def test_warm_start_permutations(Ni_in_NiTa2O6):
+    lattice, positions, numbers, _ = Ni_in_NiTa2O6
+    symprec = 1e-3
+    dataset = get_symmetry_dataset((lattice, positions, numbers), 1e-5)
+    rotations = dataset.rotations
+    translations = dataset.translations
+    expected = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec
+    ).permutations
+
+    # Next frame with small displacements
+    rng = np.random.default_rng(0)
+    new_positions = positions + 1e-6 * rng.standard_normal(positions.shape)
+    initial = expected.copy()
+    initial[1, [0, 1]] = initial[1, [1, 0]]  # Wrong candidate
+    verified = verify_permutations(
+        lattice, new_positions, numbers, rotations, translations, initial, symprec
+    )
+    assert not verified[1]
+    assert np.sum(~verified) == 1
+
+    actual = get_symmetry_permutations(
+        lattice,
+        new_positions,
+        numbers,
+        rotations,
+        translations,
+        symprec,
+        initial_permutations=initial,
+    )
+    assert np.all(actual.permutations == expected)
+
+
+def test_symmetry_permutations_with_deadline(fcc):
+    lattice, positions, numbers, _ = fcc
+    symprec = 1e-5
+    dataset = get_symmetry_dataset((lattice, positions, numbers), symprec)
+    rotations = dataset.rotations
+    translations = dataset.translations
+    expect = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec
+    )
+
+    # Stop after matching sites for three operations
+    event = Event()
+    deadline = Deadline(event=event)
+    calls = []
+
+    class _Deadline:
+        def is_set(self):
+            calls.append(None)
+            if len(calls) > 3:
+                event.set()
+            return deadline.is_set()
+
+    permutations = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec, deadline=_Deadline()
+    )
+    assert len(permutations) == 3
+    assert np.all(permutations.permutations == expect.permutations[:3])
+
+    # Operations verified from initial permutations are kept without matching sites
+    permutations = get_symmetry_permutations(
+        lattice,
+        positions,
+        numbers,
+        rotations,
+        translations,
+        symprec,
+        initial_permutations=expect,
+        deadline=deadline,
+    )
+    assert len(permutations) == len(expect)
+
+    # Indices of matched operations skip operations without permutations
+    invalid = np.array([0.1, 0, 0])
+    permutations, indices = get_symmetry_permutations(
+        lattice,
+        positions,
+        numbers,
+        np.concatenate([rotations[:1], rotations]),
+        np.concatenate([invalid[None, :], translations]),
+        symprec,
+        return_indices=True,
+    )
+    assert np.all(indices == np.arange(1, len(rotations) + 1))
+    assert np.all(permutations.permutations == expect.permutations)
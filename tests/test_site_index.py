@@ -0,0 +1,43 @@
+import numpy as np
+from spglib import get_symmetry_dataset
+
+from spinspg.permutation import get_symmetry_permutations
+from spinspg.site_index import PeriodicSiteIndex
+
+
+def test_site_index_across_boundary():
+    lattice = 3.0 * np.eye(3)
+    positions = np.array([[0, 0, 0], [0.5, 0.5, 0.5], [0.25, 0, 0]])
+    numbers = np.array([0, 0, 1])
+    symprec = 1e-3
+    index = PeriodicSiteIndex(lattice, positions, numbers, symprec)
+    assert np.all(index.bins >= 1)
+
+    # Slightly displaced images across cell boundaries
+    eps = 1e-4
+    new_positions = np.array(
+        [[0.5 - eps, -0.5 + eps, 1.5], [1 - eps, 2 + eps, -eps], [1.25, 0, 0]]
+    )
+    perm = index.match(new_positions, max_memory=1)
+    assert perm.tolist() == [1, 0, 2]
+
+    # Species should be distinguished
+    assert index.match(new_positions[[2, 1, 0]], max_memory=1 << 20) is None
+
+
+def test_symmetry_permutations_with_site_index(rutile):
+    lattice, positions, numbers, _ = rutile
+    symprec = 1e-5
+    dataset = get_symmetry_dataset((lattice, positions, numbers), symprec)
+    rotations = dataset.rotations
+    translations = dataset.translations
+    index = PeriodicSiteIndex(lattice, positions, numbers, symprec)
+    expect = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec
+    )
+    actual = get_symmetry_permutations(
+        lattice, positions, numbers, rotations, translations, symprec, site_index=index
+    )
+    assert len(actual) == len(expect)
+    for perm1, perm2 in zip(actual, expect):
+        assert np.all(perm1.permutation == perm2.permutation)
@@ -1,7 +1,13 @@
 import numpy as np
 import pytest
 
-from spinspg.spin import SpinOnlyGroupType, get_spin_only_group, solve_procrustes
+from spinspg.spin import (
+    SpinOnlyGroupType,
+    get_spin_only_group,
+    get_spin_only_group_types,
+    solve_procrustes,
+    solve_procrustes_batch,
+)
 
 
 @pytest.fixture
@@ -127,3 +133,53 @@ def test_solve_procrustes():
 
     R_actual = solve_procrustes(A, B)
     assert np.allclose(R_actual, R)
+
+
+def test_solve_procrustes_batch():
+    rng = np.random.default_rng(0)
+    A = rng.normal(size=(5, 3))
+    Rs = np.array([np.linalg.qr(rng.normal(size=(3, 3)))[0] for _ in range(4)])
+    B = np.einsum("kij,nj->kni", Rs, A)
+    B[-1, 0] += 1.0  # Perturb one site of the last problem
+
+    R_actual, residuals = solve_procrustes_batch(A, B)
+    assert R_actual.shape == (4, 3, 3)
+    for k in range(3):
+        assert np.allclose(R_actual[k], Rs[k])
+        assert np.allclose(R_actual[k], solve_procrustes(A, B[k]))
+        assert residuals[k] < 1e-8
+    assert residuals[-1] > 0.1
+
+
+@pytest.mark.parametrize("magmoms_type", ["nonmagnetic", "collinear", "coplanar", "noncoplanar"])
+def test_contain_many(request, magmoms_type):
+    magmoms = request.getfixturevalue(magmoms_type)
+    sog = get_spin_only_group(magmoms, mag_symprec=1e-5)
+
+    rng = np.random.default_rng(0)
+    linears = [np.eye(3), -np.eye(3), FOURFOLD_Z, MIRROR_X, np.diag([1, -1, 1])]
+    # Rotations and mirrors along x and z
+    for theta in [np.pi / 3, np.pi / 2, np.pi]:
+        c, s = np.cos(theta), np.sin(theta)
+        rot_z = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+        rot_x = np.array([[1, 0, 0], [0, c, -s], [0, s, c]])
+        linears.extend([rot_z, -rot_z, rot_x, -rot_x])
+    linears.extend(np.linalg.qr(rng.normal(size=(3, 3)))[0] for _ in range(10))
+    linears = np.array(linears, dtype=np.float_)
+
+    actual = sog.contain_many(linears)
+    expect = [sog.contain(linear) for linear in linears]
+    assert actual.tolist() == expect
+
+
+def test_spin_only_group_types(nonmagnetic, collinear, coplanar, noncoplanar):
+    for magmoms in [nonmagnetic, collinear, coplanar, noncoplanar]:
+        magmoms_stack = np.array([magmoms, -2 * magmoms, np.zeros_like(magmoms)])
+        types, axes = get_spin_only_group_types(magmoms_stack, 1e-5)
+        for magmoms_frame, type_, axis in zip(magmoms_stack, types, axes):
+            sog = get_spin_only_group(magmoms_frame, 1e-5)
+            assert sog.spin_only_group_type.value == type_
+            if sog.axis is None:
+                assert np.all(np.isnan(axis))
+            else:
+                assert np.allclose(np.cross(sog.axis, axis), 0)
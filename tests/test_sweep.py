@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from spinspg.group import (
+    SpinSymmetryResiduals,
+    get_primitive_spin_symmetry,
+    get_symmetry_with_cell,
+)
+from spinspg.sweep import get_spin_symmetry_sweep
+
+
+def _summarize(ssg):
+    num_operations = (
+        len(ssg.nontrivial_coset) * len(ssg.spin_translation_coset) * len(ssg.prim_centerings)
+    )
+    return ssg.spin_only_group.spin_only_group_type, num_operations
+
+
+@pytest.mark.parametrize(
+    "testcase",
+    [
+        "fcc",
+        "layer_triangular_kagome",
+        "rutile",
+        "Cr_in_Cr2O3",
+        "Mn_in_Mn3ReO6",
+        "Ni_in_NiTa2O6",
+    ],
+)
+def test_spin_symmetry_sweep(request, testcase):
+    lattice, positions, numbers, magmoms = request.getfixturevalue(testcase)
+    magmoms = np.array(magmoms, dtype=np.float_)
+    rng = np.random.default_rng(0)
+    magmoms += 1e-3 * rng.normal(size=magmoms.shape) * (np.abs(magmoms) > 0)
+    ns = get_symmetry_with_cell(lattice, positions, numbers, 1e-5, -1)
+
+    # Tolerances away from residuals by noise
+    mag_symprecs = [1e-5, 1e-1]
+    sweep = get_spin_symmetry_sweep(ns, magmoms, mag_symprecs)
+    assert np.allclose(sweep.mag_symprecs, mag_symprecs)
+    for mag_symprec, ssg, num_operations in zip(
+        mag_symprecs, sweep.spin_space_groups, sweep.num_operations
+    ):
+        expect = get_primitive_spin_symmetry(ns, magmoms, mag_symprec)
+        assert _summarize(ssg) == _summarize(expect)
+        assert num_operations == _summarize(expect)[1]
+    assert sweep.num_operations[0] < sweep.num_operations[1]
+
+    # Groups change only across critical tolerances
+    assert np.all(np.diff(sweep.critical_tolerances) > 0)
+    mag_symprecs = np.geomspace(1e-6, 1e1, 50)
+    sweep = get_spin_symmetry_sweep(ns, magmoms, mag_symprecs)
+    for i in range(len(mag_symprecs) - 1):
+        changed = _summarize(sweep.spin_space_groups[i]) != _summarize(
+            sweep.spin_space_groups[i + 1]
+        )
+        crossed = np.any(
+            (mag_symprecs[i] <= sweep.critical_tolerances)
+            & (sweep.critical_tolerances < mag_symprecs[i + 1])
+        )
+        if changed:
+            assert crossed
+
+
+def test_spin_symmetry_sweep_noisy_supercell(fcc, monkeypatch):
+    lattice, positions, numbers, magmoms = fcc
+    # Noncoplanar spin arrangement in 2x2x2 supercell with noise
+    shifts = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+    positions = ((positions[None, :, :] + shifts[:, None, :]) / 2).reshape(-1, 3)
+    numbers = np.tile(numbers, len(shifts))
+    magmoms = np.tile(np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]), (8, 1))
+    rng = np.random.default_rng(0)
+    mag_symprec = 1e-2
+    magmoms = magmoms + 0.3 * mag_symprec * rng.normal(size=magmoms.shape) / np.sqrt(3)
+    ns = get_symmetry_with_cell(2 * lattice, positions, numbers, 1e-5, -1)
+
+    # Spin space groups are assembled only for given tolerances
+    calls = []
+    original = SpinSymmetryResiduals.get_spin_space_group
+
+    def counting(self, mag_symprec):
+        calls.append(mag_symprec)
+        return original(self, mag_symprec)
+
+    monkeypatch.setattr(SpinSymmetryResiduals, "get_spin_space_group", counting)
+    mag_symprecs = [1e-4, mag_symprec]
+    sweep = get_spin_symmetry_sweep(ns, magmoms, mag_symprecs)
+    assert len(calls) == len(mag_symprecs)
+    expect = get_primitive_spin_symmetry(ns, magmoms, mag_symprec)
+    assert _summarize(sweep.spin_space_groups[1]) == _summarize(expect)
+
+    # Critical tolerances agree with a scan over all residuals
+    residuals = SpinSymmetryResiduals(ns, magmoms)
+    candidates = np.unique(
+        np.concatenate(
+            [
+                residuals.spin_only_residuals,
+                residuals.identity_residuals,
+                residuals.centering_residuals,
+                residuals.residuals.reshape(-1),
+            ]
+        )
+    )
+    summaries = [residuals.summarize(np.nextafter(t, np.inf)) for t in candidates]
+    previous = residuals.summarize(np.nextafter(0, 1))
+    critical = []
+    for candidate, summary in zip(candidates, summaries):
+        if summary != previous:
+            critical.append(candidate)
+        previous = summary
+    assert np.allclose(sweep.critical_tolerances, critical)
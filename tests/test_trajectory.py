@@ -0,0 +1,63 @@
+import numpy as np
+
+from spinspg.core import get_spin_symmetry
+from spinspg.spin import SpinOnlyGroupType
+from spinspg.trajectory import (
+    get_change_points,
+    get_spin_symmetry_trajectory,
+    get_spin_symmetry_trajectory_from_npy,
+)
+
+
+def test_spin_symmetry_trajectory(rutile):
+    lattice, positions, numbers, magmoms = rutile
+    canted = np.array(magmoms, dtype=np.float_)
+    canted[0] += [0.3, 0, 0]
+    trajectory = np.array(
+        [magmoms, magmoms, -magmoms, np.zeros_like(magmoms), canted, canted, magmoms],
+        dtype=np.float_,
+    )
+
+    result = get_spin_symmetry_trajectory(lattice, positions, numbers, trajectory, chunk_size=3)
+    assert len(result) == len(trajectory)
+    assert np.all(result.labels == [0, 0, 0, 1, 2, 2, 0])
+    assert np.all(result.change_points == [3, 4, 6])
+    assert result.num_labels == 3
+    assert np.all(result.representative_frames == [0, 3, 4])
+    assert result.spin_only_group_types[1] == SpinOnlyGroupType.NONMAGNETIC.value
+
+    # Consistent with frame-by-frame search
+    for frame, magmoms_frame in enumerate(trajectory):
+        sog, rotations, _, _ = get_spin_symmetry(lattice, positions, numbers, magmoms_frame)
+        label = result.labels[frame]
+        assert sog.spin_only_group_type.value == result.spin_only_group_types[label]
+        if sog.spin_only_group_type != SpinOnlyGroupType.NONMAGNETIC:
+            assert np.sum(result.valid[label]) == len(rotations)
+    assert (
+        result.spin_space_groups[2].spin_only_group.spin_only_group_type
+        == SpinOnlyGroupType.COPLANAR
+    )
+
+
+def test_change_points():
+    assert np.all(get_change_points(np.array([0, 0, 1, 1, 0, 2])) == [2, 4, 5])
+    assert len(get_change_points(np.array([], dtype=int))) == 0
+
+
+def test_spin_symmetry_trajectory_from_npy(tmp_path, rutile):
+    lattice, positions, numbers, magmoms = rutile
+    rng = np.random.default_rng(0)
+    trajectory = np.tile(np.array(magmoms, dtype=np.float_), (10, 1, 1))
+    trajectory[4:7] += 0.1 * rng.standard_normal((3, *trajectory.shape[1:]))
+    magmoms_path = tmp_path / "magmoms.npy"
+    labels_path = tmp_path / "labels.npy"
+    np.save(magmoms_path, trajectory)
+
+    expected = get_spin_symmetry_trajectory(lattice, positions, numbers, trajectory)
+    actual = get_spin_symmetry_trajectory_from_npy(
+        lattice, positions, numbers, magmoms_path, labels_path, chunk_size=4
+    )
+    assert np.all(actual.labels == expected.labels)
+    assert np.all(actual.change_points == expected.change_points)
+    assert np.all(actual.change_points == [4, 7])
+    assert np.all(np.load(labels_path) == expected.labels)